@@ -0,0 +1,71 @@
+// Renders figure JSON written by `build_charts.py --format json`
+// Usage: <div data-figure-src="assets/<slug>/figure.json"></div>
+//    or: <div data-figure-slug="<slug>"></div>  (looked up in assets/figures.json)
+// Paths are resolved against the site root and must stay on this site (no
+// absolute or protocol-relative URLs, since src can come from ?src=); requires
+// a global Plotly.
+(function () {
+  var script = document.currentScript;
+  // This file lives at <root>/static/js/chart-loader.js
+  var root = script ? script.src.replace(/static\/js\/chart-loader\.js(\?.*)?$/, "") : "";
+  var manifest = null;
+
+  function resolve(path) {
+    path = String(path || "");
+    if (/^([a-z][a-z0-9+.-]*:|[\/\\]{2})/i.test(path)) throw new Error("Not a site path: " + path);
+    var url = new URL(path, root || document.baseURI);
+    if (url.origin !== location.origin) throw new Error("Not a site path: " + path);
+    return url.href;
+  }
+
+  function fetchJSON(url) {
+    return fetch(url).then(function (r) {
+      if (!r.ok) throw new Error(r.status + " " + url);
+      // Pre-gzipped figures (--gzip) are inflated in the browser
+      if (/\.gz$/.test(url) && window.DecompressionStream) {
+        return new Response(r.body.pipeThrough(new DecompressionStream("gzip"))).json();
+      }
+      return r.json();
+    });
+  }
+
+  function figureURL(el) {
+    var src = el.getAttribute("data-figure-src");
+    if (src) return Promise.resolve(src).then(resolve);
+    var slug = el.getAttribute("data-figure-slug");
+    manifest = manifest || Promise.resolve("assets/figures.json").then(resolve).then(fetchJSON);
+    return manifest.then(function (m) {
+      if (!m[slug]) throw new Error("Unknown figure: " + slug);
+      return resolve(m[slug]);
+    });
+  }
+
+  function render(el) {
+    if (el.getAttribute("data-figure-rendered")) return Promise.resolve(el);
+    el.setAttribute("data-figure-rendered", "1");
+    return figureURL(el).then(fetchJSON).then(function (fig) {
+      // --typed-arrays writes repeated x/y arrays once, as {"shared": <trace index>}
+      fig.data.forEach(function (t) {
+        ["x", "y"].forEach(function (k) {
+          if (t[k] && t[k].shared !== undefined) t[k] = fig.data[t[k].shared][k];
+        });
+      });
+      var config = Object.assign({ responsive: true, displaylogo: false }, fig.config || {});
+      return window.Plotly.newPlot(el, fig.data, fig.layout, config);
+    }).catch(function (e) {
+      el.textContent = "Chart could not be loaded (" + e.message + ")";
+    });
+  }
+
+  function renderAll(scope) {
+    var els = (scope || document).querySelectorAll("[data-figure-src],[data-figure-slug]");
+    return Promise.all(Array.prototype.map.call(els, render));
+  }
+
+  window.DashboardCharts = { render: render, renderAll: renderAll };
+  if (document.readyState === "loading") {
+    document.addEventListener("DOMContentLoaded", function () { renderAll(); });
+  } else {
+    renderAll();
+  }
+})();
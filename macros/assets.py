@@ -1,5 +1,6 @@
 import os, io, json, textwrap
 from datetime import date
+from urllib.parse import quote
 
 def define_env(env):
     """Define macros for MkDocs"""
@@ -53,6 +54,10 @@ def _downloads_html(files, site_url=""):
                 parts.append(f'<a class="dl-btn" href="{file_path}" download>{label}</a>')
     return " ".join(parts)
 
+def figure_loader_path(figure_path: str) -> str:
+    """Site-relative URL of the shared loader page for a figure JSON file"""
+    return f"static/figure.html?src={quote(figure_path)}"
+
 def asset_page_content_standalone(meta, site_url=""):
     """ Generate the main content for an asset detail page """
     from pathlib import Path
@@ -79,6 +84,11 @@ def asset_page_content_standalone(meta, site_url=""):
         else:
             chart_url = html_path
         body.append(f'<div class="chart-embed"><iframe src="{chart_url}" loading="lazy" allowfullscreen style="width:100%;height:600px;border:1px solid #ddd;border-radius:4px;"></iframe></div>')
+    elif 'figure' in files:
+        # Figure JSON (build_charts.py --format json) rendered by the shared loader page
+        loader = figure_loader_path(files['figure'])
+        chart_url = abs_url_standalone(loader, site_url) if site_url else f"../../{loader}"
+        body.append(f'<div class="chart-embed"><iframe src="{chart_url}" loading="lazy" allowfullscreen style="width:100%;height:600px;border:1px solid #ddd;border-radius:4px;"></iframe></div>')
     elif atype == 'figure':
         # Prefer SVG if present for crispness
         img = files.get('svg') or files.get('png')
@@ -111,13 +121,16 @@ def embed_page_content_standalone(meta, site_url=""):
     title = meta.get('title', meta.get('slug', 'Asset'))
     slug = meta.get('slug', '')
     
-    if 'html' in files:
+    if 'html' in files or 'figure' in files:
         # For embed pages, construct the correct relative path to the chart
-        html_path = files["html"]
+        html_path = files["html"] if 'html' in files else figure_loader_path(files["figure"])
         if html_path.startswith('assets/'):
             # Convert assets/slug/filename.html to ../slug/filename.html for embed pages
             path_parts = html_path.split('/')
             relative_url = f"../{'/'.join(path_parts[1:])}"  # Remove 'assets' and add '..'
+        elif html_path.startswith('static/'):
+            # Embed pages live at assets/<slug>-embed/
+            relative_url = f"../../{html_path}"
         else:
             relative_url = html_path
         return f"""
@@ -1,59 +1,155 @@
 # Chart registry and theme system
+#
+# pandas and plotly are imported inside the builders, so importing this module
+# (for the registry, cache keys or the theme) stays cheap on fully cached builds.
+from __future__ import annotations
+
+import copy
+import hashlib
+import inspect
+import re
+import types
 from dataclasses import dataclass
-from typing import Callable, Dict
+from typing import TYPE_CHECKING, Callable, Dict, List, Tuple
 from pathlib import Path
 import yaml
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+
+from macros.datasets import dataset_cache, load_dataset
+from macros.downsample import downsample_figure, downsample_options
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 # Global registry for chart types
 _REGISTRY: Dict[str, Callable] = {}
+# Builder params that name files the builder reads (used for cache invalidation)
+_INPUTS: Dict[str, Tuple[str, ...]] = {}
 
-def chart(name: str):
+def chart(name: str, inputs: Tuple[str, ...] = ("data_path",)):
     """Decorator to register chart builder functions"""
     def wrap(fn): 
         _REGISTRY[name] = fn
+        _INPUTS[name] = tuple(inputs)
         return fn
     return wrap
 
-@dataclass
+def builder_inputs(chart_type: str, params: dict) -> List[str]:
+    """File paths a builder reads, resolved from its params"""
+    return [params[k] for k in _INPUTS.get(chart_type, ()) if params.get(k)]
+
+def _code_refs(code) -> set:
+    """Global names referenced by a code object, including nested ones"""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _code_refs(const)
+    return names
+
+def builder_source_hash(chart_type: str) -> str:
+    """
+    Hash the source of a builder, build() and every project helper they call.
+
+    Editing one builder (or a helper only it uses) invalidates just the
+    charts of that type; editing a shared helper invalidates all its users.
+    Helpers are followed into other macros modules (e.g. macros.downsample).
+    """
+    seen, stack, h = {}, [_REGISTRY[chart_type], build], hashlib.sha256()
+    while stack:
+        f = stack.pop()
+        key = (f.__module__, f.__name__)
+        if key in seen:
+            continue
+        seen[key] = f
+        for name in sorted(_code_refs(f.__code__)):
+            ref = f.__globals__.get(name)
+            if isinstance(ref, types.FunctionType) and ref.__module__.startswith("macros."):
+                stack.append(ref)
+    for key in sorted(seen):
+        h.update(inspect.getsource(seen[key]).encode())
+    return h.hexdigest()
+
+SITE_PATH = Path("docs/_data/site.yml")
+
+@dataclass(frozen=True)
 class Theme:
     """Theme configuration for charts"""
-    colors: list
+    colors: Tuple[str, ...]
     template: str
     font: str
     title_size: int
+    webgl_threshold: int = 5000
 
-def load_theme() -> Theme:
-    """Load theme configuration from site.yml"""
-    site_path = Path("docs/_data/site.yml")
-    if not site_path.exists():
-        # Fallback theme if site.yml doesn't exist
-        return Theme(
-            colors=["#005EB8", "#00A3E0", "#FFC300"],
-            template="simple_white",
-            font="Inter, sans-serif",
-            title_size=20
-        )
-    
-    site = yaml.safe_load(site_path.read_text())
+# Fallback theme if site.yml doesn't exist
+DEFAULT_THEME = Theme(
+    colors=("#005EB8", "#00A3E0", "#FFC300"),
+    template="simple_white",
+    font="Inter, sans-serif",
+    title_size=20
+)
+
+def _theme_from_site(site: dict) -> Theme:
+    """Build the chart theme from a parsed site.yml"""
     c = site["charts"]["colors"]
     charts_config = site["charts"]
     
     return Theme(
-        colors=[c["primary"], c["secondary"], c["accent"]],
+        colors=(c["primary"], c["secondary"], c["accent"]),
         template=charts_config.get("template", "simple_white"),
         font=charts_config["font_family"],
-        title_size=charts_config["title_size"]
+        title_size=charts_config["title_size"],
+        webgl_threshold=charts_config.get("webgl_threshold", DEFAULT_THEME.webgl_threshold)
     )
 
+class SiteConfig:
+    """
+    Parses site.yml once and hands out the config and theme.
+
+    The file is re-parsed only when its mtime or size changes, so a build
+    with hundreds of charts costs one YAML parse plus a stat() per lookup.
+    """
+
+    def __init__(self, path: Path = SITE_PATH):
+        self.path = Path(path)
+        self._stamp = None
+        self._loaded = False
+        self._site: dict = {}
+        self._theme: Theme = DEFAULT_THEME
+
+    def _refresh(self):
+        try:
+            st = self.path.stat()
+            stamp = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            stamp = None
+        if self._loaded and stamp == self._stamp:
+            return
+        
+        if stamp is None:
+            self._site, self._theme = {}, DEFAULT_THEME
+        else:
+            self._site = yaml.safe_load(self.path.read_text()) or {}
+            self._theme = _theme_from_site(self._site)
+        self._stamp, self._loaded = stamp, True
+
+    def theme(self) -> Theme:
+        """Current (immutable) theme"""
+        self._refresh()
+        return self._theme
+
+    def config(self) -> dict:
+        """Current site configuration (a copy, safe to modify)"""
+        self._refresh()
+        return copy.deepcopy(self._site)
+
+_SITE = SiteConfig()
+
+def load_theme() -> Theme:
+    """Load theme configuration from site.yml"""
+    return _SITE.theme()
+
 def load_site_config():
     """Load full site configuration"""
-    site_path = Path("docs/_data/site.yml")
-    if site_path.exists():
-        return yaml.safe_load(site_path.read_text())
-    return {}
+    return _SITE.config()
 
 def color_from_alias(alias: str, site: dict) -> str:
     """Resolve color alias to actual color value"""
@@ -74,7 +170,7 @@ def apply_theme_and_responsive(fig, theme: Theme):
     """Apply theme and responsive settings to a figure"""
     fig.update_layout(
         template=theme.template,
-        colorway=theme.colors,
+        colorway=list(theme.colors),
         font=dict(family=theme.font),
         title_font_size=theme.title_size,
         # Responsive margins and sizing
@@ -96,30 +192,71 @@ def apply_theme_and_responsive(fig, theme: Theme):
     
     return fig
 
+# Derived series on line specs: `trend: rolling(4)` or `trend: rolling(12, median)`
+_TREND = re.compile(r"^\s*rolling\(\s*(\d+)\s*(?:,\s*(mean|median|sum|min|max)\s*)?\)\s*$")
+
+def parse_trend(trend: str) -> Tuple[int, str]:
+    """'rolling(4)' -> (4, 'mean')"""
+    m = _TREND.match(str(trend))
+    if not m or int(m.group(1)) < 1:
+        raise ValueError(f"Invalid trend: {trend!r}. Expected e.g. 'rolling(4)' or 'rolling(4, median)'")
+    return int(m.group(1)), m.group(2) or "mean"
+
+def trend_series(data_path, column: str, trend: str) -> pd.Series:
+    """Rolling statistic of a column, computed once per dataset fingerprint"""
+    window, stat = parse_trend(trend)
+    return dataset_cache().derived(
+        data_path, ("rolling", column, window, stat),
+        lambda df: df[column].rolling(window, min_periods=window).agg(stat),
+    )
+
 @chart("line_multi")
-def line_multi(data_path, x, ys, title):
-    """Multi-line chart builder"""
-    theme = load_theme()
-    df = pd.read_csv(data_path)
+def line_multi(data_path, x, ys, title="", trend=None, *, theme: Theme, **kwargs):
+    """Multi-line chart builder, with an optional rolling trend line per series"""
+    import plotly.graph_objects as go
+    from plotly.colors import qualitative
+    
+    df = load_dataset(data_path)
+    ys = [ys] if isinstance(ys, str) else ys
     
-    fig = px.line(df, x=x, y=ys, title=title)
+    # Same traces and axis titles px.line(df, x=x, y=ys) produces, in px's default colors
+    hovertemplate = "%{fullData.name}<br>%{xaxis.title.text}=%{x}<br>%{yaxis.title.text}=%{y}<extra></extra>"
+    fig = go.Figure([
+        go.Scatter(
+            x=df[x], y=df[col],
+            mode="lines",
+            name=col, legendgroup=col, showlegend=True,
+            line=dict(color=qualitative.Plotly[i % len(qualitative.Plotly)], width=2, dash="dash" if trend else None),
+            marker=dict(symbol="circle"),
+            hovertemplate=hovertemplate,
+        )
+        for i, col in enumerate(ys)
+    ])
+    fig.update_layout(xaxis_title_text=x, yaxis_title_text="value", legend_tracegroupgap=0)
+    if title:
+        fig.update_layout(title_text=title)
     
     # Apply theme and responsive settings
     apply_theme_and_responsive(fig, theme)
     
-    # Style traces and clean up hover template
-    fig.update_traces(
-        line=dict(width=2),
-        hovertemplate="%{fullData.name}<br>%{xaxis.title.text}=%{x}<br>%{yaxis.title.text}=%{y}<extra></extra>"
-    )
+    if trend:
+        for trace in list(fig.data):
+            fig.add_trace(go.Scatter(
+                x=df[x], y=trend_series(data_path, trace.name, trend),
+                mode="lines",
+                name=f"{trace.name} (voortschrijdend gemiddelde)",
+                line=dict(color=trace.line.color, width=3),
+                hovertemplate=hovertemplate,
+            ))
     
     return fig
 
 @chart("bar_grouped")
-def bar_grouped(data_path, x, y, color, title):
+def bar_grouped(data_path, x, y, color, title="", *, theme: Theme, **kwargs):
     """Grouped bar chart builder"""
-    theme = load_theme()
-    df = pd.read_csv(data_path)
+    import plotly.express as px
+    
+    df = load_dataset(data_path)
     
     fig = px.bar(df, x=x, y=y, color=color, title=title, barmode='group')
     
@@ -129,10 +266,11 @@ def bar_grouped(data_path, x, y, color, title):
     return fig
 
 @chart("scatter_trend")
-def scatter_trend(data_path, x, y, color=None, title="", trendline=True):
+def scatter_trend(data_path, x, y, color=None, title="", trendline=True, *, theme: Theme, **kwargs):
     """Scatter plot with trend line"""
-    theme = load_theme()
-    df = pd.read_csv(data_path)
+    import plotly.express as px
+    
+    df = load_dataset(data_path)
     
     fig = px.scatter(
         df, x=x, y=y, color=color, title=title,
@@ -145,10 +283,11 @@ def scatter_trend(data_path, x, y, color=None, title="", trendline=True):
     return fig
 
 @chart("area_filled")
-def area_filled(data_path, x, y, color=None, title=""):
+def area_filled(data_path, x, y, color=None, title="", *, theme: Theme, **kwargs):
     """Area chart builder"""
-    theme = load_theme()
-    df = pd.read_csv(data_path)
+    import plotly.express as px
+    
+    df = load_dataset(data_path)
     
     fig = px.area(df, x=x, y=y, color=color, title=title)
     
@@ -158,10 +297,16 @@ def area_filled(data_path, x, y, color=None, title=""):
     return fig
 
 @chart("line_pair")
-def line_pair(data_path, x, series, color="primary", title="", **kwargs):
-    """Line chart with quarterly data + trend line (dashed + solid)"""
-    theme = load_theme()
-    df = pd.read_csv(data_path)
+def line_pair(data_path, x, series, color="primary", title="", trend=None, *, theme: Theme, **kwargs):
+    """
+    Line chart with quarterly data + trend line (dashed + solid)
+
+    The trend is the series with role "trend", or computed from the monthly
+    series when the spec sets e.g. `trend: rolling(4)`.
+    """
+    import plotly.graph_objects as go
+    
+    df = load_dataset(data_path)
     
     # Resolve color
     if color == "primary":
@@ -172,11 +317,11 @@ def line_pair(data_path, x, series, color="primary", title="", **kwargs):
         color = theme.colors[2] if len(theme.colors) > 2 else theme.colors[0]
 
     # Find series by role
-    monthly_series = next(s for s in series if s["role"] == "monthly")
-    trend_series = next(s for s in series if s["role"] == "trend")
-    
-    monthly_col = monthly_series["column"]
-    trend_col = trend_series["column"]
+    monthly_col = next(s for s in series if s["role"] == "monthly")["column"]
+    if trend:
+        trend_values = trend_series(data_path, monthly_col, trend)
+    else:
+        trend_values = df[next(s for s in series if s["role"] == "trend")["column"]]
 
     fig = go.Figure([
         go.Scatter(
@@ -186,7 +331,7 @@ def line_pair(data_path, x, series, color="primary", title="", **kwargs):
             line=dict(color=color, width=2, dash="dash")
         ),
         go.Scatter(
-            x=df[x], y=df[trend_col], 
+            x=df[x], y=trend_values, 
             mode="lines",
             name="1-jarig voortschrijdend gemiddelde", 
             line=dict(color=color, width=3)
@@ -198,14 +343,15 @@ def line_pair(data_path, x, series, color="primary", title="", **kwargs):
 
     return fig
 
-@chart("line_dual_data")
-def line_dual_data(yearly_data_path, monthly_data_path, x_yearly, x_monthly, y_yearly, y_monthly, color="primary", title="", yearly_name="Yearly trend", monthly_name="Monthly data", **kwargs):
+@chart("line_dual_data", inputs=("yearly_data_path", "monthly_data_path"))
+def line_dual_data(yearly_data_path, monthly_data_path, x_yearly, x_monthly, y_yearly, y_monthly, color="primary", title="", yearly_name="Yearly trend", monthly_name="Monthly data", *, theme: Theme, **kwargs):
     """Line chart with data from two sources - yearly (solid) and monthly (dashed)"""
-    theme = load_theme()
+    import pandas as pd
+    import plotly.graph_objects as go
     
     # Load both datasets
-    df_yearly = pd.read_csv(yearly_data_path)
-    df_monthly = pd.read_csv(monthly_data_path)
+    df_yearly = load_dataset(yearly_data_path, columns=[x_yearly, y_yearly])
+    df_monthly = load_dataset(monthly_data_path, columns=[x_monthly, y_monthly])
     
     # Convert yearly data to datetime (assuming year column contains just years)
     if x_yearly == "Jaar":
@@ -213,8 +359,9 @@ def line_dual_data(yearly_data_path, monthly_data_path, x_yearly, x_monthly, y_y
     else:
         df_yearly[x_yearly] = pd.to_datetime(df_yearly[x_yearly])
     
-    # Ensure monthly data is datetime
-    df_monthly[x_monthly] = pd.to_datetime(df_monthly[x_monthly])
+    # Ensure monthly data is datetime (the dataset cache already parses ISO dates)
+    if not pd.api.types.is_datetime64_any_dtype(df_monthly[x_monthly]):
+        df_monthly[x_monthly] = pd.to_datetime(df_monthly[x_monthly])
     
     # Resolve color
     if color == "primary":
@@ -253,9 +400,78 @@ def line_dual_data(yearly_data_path, monthly_data_path, x_yearly, x_monthly, y_y
 
     return fig
 
-def build(chart_type: str, **kwargs):
-    """Build a chart using the registry"""
+def rendered_points(fig) -> int:
+    """Number of points the figure's scatter traces draw"""
+    return sum(len(t.y) for t in fig.data if t.type in ("scatter", "scattergl") and t.y is not None)
+
+def use_webgl(fig, webgl=None, threshold: int = DEFAULT_THEME.webgl_threshold):
+    """
+    Choose between SVG Scatter and WebGL Scattergl line traces.
+
+    `webgl` True/False forces the choice; None switches to WebGL when the
+    figure draws more than `threshold` points. This also overrides px's own
+    1000-row "auto" render mode. Stacked traces (area charts) stay SVG since
+    Scattergl cannot stack.
+    """
+    import plotly.graph_objects as go
+    
+    if webgl is None:
+        webgl = rendered_points(fig) > threshold
+    source, target = ("scatter", go.Scattergl) if webgl else ("scattergl", go.Scatter)
+    convert = [t.type == source and (source == "scattergl" or t.stackgroup is None) for t in fig.data]
+    if not any(convert):
+        return fig
+    
+    traces = []
+    for trace, swap in zip(fig.data, convert):
+        if swap:
+            props = trace.to_plotly_json()
+            props.pop("type")
+            trace = target(**props)
+        traces.append(trace)
+    fig.data = []
+    fig.add_traces(traces)
+    return fig
+
+def compact_dates(fig):
+    """
+    Write date-only x/y arrays as YYYY-MM-DD strings.
+
+    Data is loaded with datetime columns, which plotly would serialize as
+    full timestamps ("2021-01-01T00:00:00"). Arrays with a time of day
+    other than midnight are left as they are.
+    """
+    import numpy as np
+    
+    for trace in fig.data:
+        for key in ("x", "y"):
+            values = trace[key] if key in trace else None
+            if not isinstance(values, np.ndarray) or values.dtype.kind != "M":
+                continue
+            days = values.astype("datetime64[D]")
+            known = ~np.isnat(values)
+            if (days[known] == values[known]).all():
+                text = np.datetime_as_string(days, unit="D").astype(object)
+                text[~known] = None
+                trace[key] = text
+    return fig
+
+def build(chart_type: str, theme: Theme = None, downsample=None, webgl=None, **kwargs):
+    """
+    Build a chart using the registry, injecting the theme into the builder.
+
+    `downsample` (a point count or {method, points}) thins dense line traces
+    after the builder ran, so trends are still computed on the full series.
+    `webgl` (true/false, default automatic above theme.webgl_threshold
+    points) then selects Scattergl for the remaining points. Date-only
+    axes are written as YYYY-MM-DD (see compact_dates).
+    """
     if chart_type not in _REGISTRY:
         raise ValueError(f"Unknown chart type: {chart_type}. Available types: {list(_REGISTRY.keys())}")
     
-    return _REGISTRY[chart_type](**kwargs)
+    theme = theme or load_theme()
+    fig = _REGISTRY[chart_type](theme=theme, **kwargs)
+    if downsample:
+        method, points = downsample_options(downsample)
+        downsample_figure(fig, method=method, points=points)
+    return compact_dates(use_webgl(fig, webgl, theme.webgl_threshold))
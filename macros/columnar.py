@@ -0,0 +1,107 @@
+# Optional Parquet sidecars for report CSVs (requires pyarrow)
+from __future__ import annotations
+
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Sequence
+
+from macros.depcache import hash_file, hash_text
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Sidecars are build artifacts; the CSV stays the published download
+SIDECAR_DIR = Path(".cache/columnar")
+
+# Parquet metadata key holding the sha256 of the CSV a sidecar mirrors
+SOURCE_KEY = b"dashboard.source_sha256"
+
+
+@lru_cache(maxsize=None)
+def _have_pyarrow() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def available() -> bool:
+    """True when pyarrow is installed and DASHBOARD_COLUMNAR is not set to 0"""
+    return os.environ.get("DASHBOARD_COLUMNAR", "1") != "0" and _have_pyarrow()
+
+
+def sidecar_path(csv_path) -> Path:
+    """Sidecar location mirroring the CSV's path under SIDECAR_DIR"""
+    p = Path(csv_path).resolve()
+    try:
+        rel = p.relative_to(Path.cwd().resolve())
+    except ValueError:
+        rel = Path("_external") / hash_text(p.as_posix())[:16] / p.name
+    return SIDECAR_DIR / rel.parent / f"{rel.name}.parquet"
+
+
+def _as_read(df: pd.DataFrame) -> pd.DataFrame:
+    """Store nullable integers without gaps as int64, as read_csv would infer them"""
+    import pandas as pd
+
+    ints = {
+        col: "int64" for col in df.columns
+        if isinstance(df[col].dtype, pd.api.extensions.ExtensionDtype)
+        and pd.api.types.is_integer_dtype(df[col].dtype) and not df[col].hasnans
+    }
+    return df.astype(ints) if ints else df
+
+
+def read_sidecar(csv_path, digest: str, columns: Optional[Sequence[str]] = None) -> Optional[pd.DataFrame]:
+    """
+    Typed frame for a CSV from its sidecar, or None.
+
+    None when pyarrow is missing, there is no sidecar, or the sidecar was
+    written for different CSV content than ``digest``.
+    """
+    if not available():
+        return None
+    path = sidecar_path(csv_path)
+    if not path.exists():
+        return None
+
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    try:
+        meta = pq.read_schema(path).metadata or {}
+        if meta.get(SOURCE_KEY, b"").decode() != digest:
+            return None
+        return pd.read_parquet(path, columns=list(columns) if columns is not None else None)
+    except (OSError, ValueError, pa.ArrowException):
+        return None  # unreadable sidecar; the CSV is the source of truth
+
+
+def write_sidecar(df: pd.DataFrame, csv_path, digest: str) -> Optional[Path]:
+    """Write the typed frame behind a CSV whose content hash is digest"""
+    if not available():
+        return None
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(_as_read(df), preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), SOURCE_KEY: digest.encode()})
+    path = sidecar_path(csv_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+    return path
+
+
+def write_csv(df: pd.DataFrame, path) -> Path:
+    """Write a CSV (the published file) and its typed sidecar"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(path, index=False)
+    write_sidecar(df, path, hash_file(path))
+    return path
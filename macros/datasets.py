@@ -0,0 +1,190 @@
+# Process-wide dataset cache shared by chart builders and report scripts
+from __future__ import annotations
+
+import csv
+import errno
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Hashable, List, Optional, Sequence
+
+from macros.columnar import read_sidecar, write_sidecar
+from macros.depcache import FileHasher
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Upper bound for cached frames, override with DASHBOARD_DATASET_CACHE_MB
+DEFAULT_MAX_BYTES = int(os.environ.get("DASHBOARD_DATASET_CACHE_MB", "256")) * 1024 * 1024
+
+# ISO dates as written by the ETL scripts: 2021-01-01 or 2021-01-01 00:00:00
+_ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?$")
+
+
+def _parse_dates(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert ISO-date text columns to datetime64 once, at load time"""
+    import pandas as pd
+
+    for col in df.select_dtypes(include=["object", "string"]).columns:
+        values = df[col].dropna()
+        if values.empty or not _ISO_DATE.match(str(values.iloc[0])):
+            continue
+        try:
+            df[col] = pd.to_datetime(df[col], format="ISO8601")
+        except (ValueError, TypeError):
+            continue  # mixed content, leave as text
+    return df
+
+
+def read_table(path, digest: str, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """
+    Parse a CSV (only ``columns``, if given), preferring its fresh Parquet sidecar.
+
+    Without a fresh sidecar the CSV is parsed and, when pyarrow is
+    available and the whole file was read, a sidecar is written for the
+    next run.
+    """
+    df = read_sidecar(path, digest, columns)
+    if df is None:
+        import pandas as pd
+
+        df = _parse_dates(pd.read_csv(path, usecols=list(columns) if columns is not None else None))
+        if columns is None:
+            write_sidecar(df, path, digest)
+    return df
+
+
+def read_header(path) -> List[str]:
+    """Column names from a CSV's first line, without parsing the rest"""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return next(csv.reader(f), [])
+
+
+def sample_dtypes(path, rows: int) -> Dict[str, str]:
+    """Column dtypes inferred from the first rows, dates parsed as at load time"""
+    import pandas as pd
+
+    df = _parse_dates(pd.read_csv(path, nrows=rows))
+    return {col: str(dtype) for col, dtype in df.dtypes.items()}
+
+
+class DatasetCache:
+    """
+    LRU cache of parsed CSVs keyed by (path, content hash, columns).
+
+    Misses read the CSV's Parquet sidecar when it is fresh (see read_table).
+    A load with ``columns`` is served from a cached frame holding them, or
+    reads only those columns.
+
+    Frames are evicted least-recently-used first once their combined
+    in-memory size exceeds ``max_bytes``. A changed file gets a new key, so
+    stale frames are never served and are dropped on the next load.
+    Values derived from a frame (see ``derived``) are dropped with it.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._frames: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._derived: dict = {}
+        self._bytes = 0
+        self._hasher = FileHasher()
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def load(self, path, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Return the dataset at path, parsing it only on a cache miss.
+
+        The returned frame is a shallow copy: assigning whole columns is
+        safe, in-place edits of cached values are not.
+        """
+        if columns is not None:
+            columns = list(dict.fromkeys(columns))
+        base = self._key(path)
+        key = base + (None if columns is None else frozenset(columns),)
+
+        with self._lock:
+            for k in self._frames:
+                if k[:2] == base and (k[2] is None or (key[2] is not None and key[2] <= k[2])):
+                    self._frames.move_to_end(k)
+                    self.hits += 1
+                    return _project(self._frames[k][0], columns)
+
+        df = read_table(path, base[1], columns)
+        nbytes = int(df.memory_usage(deep=True).sum())
+
+        with self._lock:
+            self.misses += 1
+            # Older versions of the file, and column subsets a full frame replaces
+            for old in [k for k in self._frames if k[0] == key[0] and (k[1] != key[1] or key[2] is None)]:
+                self._evict(old)
+            self._frames[key] = (df, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and len(self._frames) > 1:
+                self._evict(next(iter(self._frames)))
+        return _project(df, columns)
+
+    def derived(self, path, name: Hashable, compute: Callable[[pd.DataFrame], object]):
+        """
+        Memoize compute(frame) per dataset fingerprint.
+
+        ``name`` identifies the computation (e.g. a column and window); the
+        result is recomputed only when the file's content changes.
+        """
+        key = (self._key(path) + (None,), name)
+        with self._lock:
+            if key in self._derived:
+                self.hits += 1
+                return self._derived[key]
+
+        value = compute(self.load(path))
+        with self._lock:
+            if key[0] in self._frames:  # not evicted meanwhile
+                self._derived[key] = value
+        return value
+
+    def clear(self):
+        """Drop every cached frame"""
+        with self._lock:
+            self._frames.clear()
+            self._derived.clear()
+            self._bytes = 0
+
+    def _key(self, path) -> tuple:
+        path = Path(path)
+        digest = self._hasher.digest(path)
+        if digest is None:
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), str(path))
+        return (path.resolve().as_posix(), digest)
+
+    def _evict(self, key: tuple):
+        """Drop a frame and everything derived from it (lock held)"""
+        self._bytes -= self._frames.pop(key)[1]
+        for k in [k for k in self._derived if k[0] == key]:
+            del self._derived[k]
+
+
+def _project(df: pd.DataFrame, columns: Optional[Sequence[str]]) -> pd.DataFrame:
+    if columns is None:
+        return df.copy(deep=False)
+    return df[list(columns)].copy(deep=False)
+
+
+_CACHE = DatasetCache()
+
+
+def dataset_cache() -> DatasetCache:
+    """The process-wide cache instance"""
+    return _CACHE
+
+
+def load_dataset(path, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Load a CSV through the process-wide dataset cache"""
+    return _CACHE.load(path, columns)
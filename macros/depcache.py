@@ -0,0 +1,156 @@
+# Content-addressed dependency cache shared by the build scripts
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+# Bump when the layout of the cache file changes; older caches are discarded
+CACHE_VERSION = 2
+
+_CHUNK = 1 << 20
+
+
+def hash_obj(obj) -> str:
+    """Stable sha256 of a JSON-serializable object"""
+    data = json.dumps(obj, sort_keys=True, default=str).encode()
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_text(text: str) -> str:
+    """sha256 of a text blob"""
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def hash_file(path: Path) -> str:
+    """sha256 of a file's content, read in chunks"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_CHUNK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class FileHasher:
+    """
+    Content hashes for input files with an mtime+size fast path.
+
+    A file is only re-read when its (mtime_ns, size) differs from the last
+    recorded stat, so warm builds cost one stat() per input while a fresh
+    checkout (new mtimes, same bytes) still produces the same digests.
+    """
+
+    def __init__(self, known: Optional[Dict[str, dict]] = None):
+        self._known = dict(known or {})
+        self.entries: Dict[str, dict] = {}
+
+    def digest(self, path) -> Optional[str]:
+        """Return the content hash of path, or None if it does not exist"""
+        p = Path(path)
+        key = p.as_posix()
+        try:
+            st = p.stat()
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+        entry = self.entries.get(key) or self._known.get(key)
+        if not (entry and entry.get("mtime_ns") == st.st_mtime_ns and entry.get("size") == st.st_size):
+            entry = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": hash_file(p)}
+        self.entries[key] = entry
+        return entry["sha256"]
+
+    def digests(self, paths: Iterable) -> Dict[str, Optional[str]]:
+        """Content hashes for several paths, keyed by posix path"""
+        return {Path(p).as_posix(): self.digest(p) for p in paths}
+
+
+class BuildCache:
+    """
+    Per-output dependency records persisted as JSON.
+
+    Layout::
+
+        {
+          "version": 2,
+          "files":   {path: {"mtime_ns", "size", "sha256"}},
+          "outputs": {output: {"fingerprint": str, "deps": {...}, "meta": {...}}}
+        }
+
+    ``deps`` holds one hash per dependency (spec, builder source, theme,
+    writer, and a ``{path: sha256}`` map of input files) so a rebuild can
+    say *why* it happened.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        data = self._read()
+        self.hasher = FileHasher(data.get("files"))
+        self._previous: Dict[str, dict] = data.get("outputs", {})
+        self.outputs: Dict[str, dict] = {}
+
+    def _read(self) -> dict:
+        if not self.path.exists():
+            return {}
+        try:
+            data = json.loads(self.path.read_text())
+        except (json.JSONDecodeError, OSError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+            return {}
+        return data
+
+    def recorded(self) -> List[str]:
+        """Outputs recorded by the previous run"""
+        return list(self._previous)
+
+    def lookup(self, key: str) -> Optional[dict]:
+        """Previous record for an output, if any"""
+        return self._previous.get(key)
+
+    def is_fresh(self, key: str, fp: str, output_path: Path) -> bool:
+        """True when the recorded fingerprint matches and the output exists"""
+        prev = self._previous.get(key)
+        return bool(prev) and prev.get("fingerprint") == fp and Path(output_path).exists()
+
+    def keep(self, key: str):
+        """Carry an unchanged record over to the next cache file"""
+        if key in self._previous:
+            self.outputs[key] = self._previous[key]
+
+    def record(self, key: str, fp: str, deps: dict, meta: Optional[dict] = None):
+        """Store the dependency record (and optional metadata) of a freshly built output"""
+        self.outputs[key] = {"fingerprint": fp, "deps": deps}
+        if meta:
+            self.outputs[key]["meta"] = meta
+
+    def changed(self, key: str, deps: dict) -> List[str]:
+        """Names of the dependencies that differ from the previous record"""
+        prev = (self._previous.get(key) or {}).get("deps")
+        if not prev:
+            return ["new"]
+        reasons = []
+        for name, value in deps.items():
+            if name == "inputs":
+                old = prev.get("inputs", {})
+                reasons += [p for p, h in value.items() if old.get(p) != h]
+                reasons += [p for p in old if p not in value]
+            elif prev.get(name) != value:
+                reasons.append(name)
+        return reasons
+
+    def save(self):
+        """Write the cache atomically"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": CACHE_VERSION,
+            "files": dict(sorted(self.hasher.entries.items())),
+            "outputs": dict(sorted(self.outputs.items())),
+        }
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(data, indent=2))
+        os.replace(tmp, self.path)
+
+
+def fingerprint(deps: dict) -> str:
+    """Collapse a dependency record into a single fingerprint"""
+    return hash_obj(deps)
@@ -0,0 +1,161 @@
+# Server-side downsampling of dense line traces (opt-in per chart spec)
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Tuple
+
+# numpy is imported where it is used, so charts that never downsample don't load it
+if TYPE_CHECKING:
+    import numpy as np
+
+METHODS = ("lttb", "minmax")
+DEFAULT_POINTS = 1000
+
+# Per-point trace arrays that must stay aligned with x/y
+_ALIGNED = ("customdata", "text", "hovertext")
+
+
+def downsample_options(spec) -> Tuple[str, int]:
+    """
+    Normalize a spec's `downsample` value to (method, points).
+
+    Accepts a point count (``downsample: 800``, LTTB) or a mapping
+    (``downsample: {method: minmax, points: 800}``).
+    """
+    if isinstance(spec, dict):
+        method = spec.get("method", "lttb")
+        points = spec.get("points", DEFAULT_POINTS)
+    else:
+        method, points = "lttb", spec
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsample method: {method}. Available methods: {list(METHODS)}")
+    if not isinstance(points, int) or points < 4:
+        raise ValueError(f"downsample points must be an integer >= 4, got {points!r}")
+    return method, points
+
+
+def _numeric_x(x) -> np.ndarray:
+    """x as float64 for the triangle geometry: dates as epoch ns, anything else as positions"""
+    import numpy as np
+
+    arr = np.asarray(x)
+    if arr.dtype.kind in "iufb":
+        return arr.astype(float)
+    if arr.dtype.kind == "M":
+        return arr.astype("datetime64[ns]").astype("int64").astype(float)
+    import pandas as pd
+
+    try:
+        return pd.to_datetime(arr).as_unit("ns").asi8.astype(float)
+    except (ValueError, TypeError):
+        return np.arange(len(arr), dtype=float)
+
+
+def lttb_indices(x, y, points: int) -> np.ndarray:
+    """
+    Indices selected by Largest-Triangle-Three-Buckets.
+
+    Bucket means are computed for all buckets at once with reduceat; the
+    remaining loop runs once per output point, doing one vectorized argmax
+    over its bucket. First and last points are always kept.
+    """
+    import numpy as np
+
+    x = _numeric_x(x)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if points >= n:
+        return np.arange(n)
+
+    # points - 2 buckets over the inner points, plus the last point as a final bucket
+    edges = np.append(np.linspace(1, n - 1, points - 1).astype(np.int64), n)
+    counts = np.diff(edges)
+    valid = ~np.isnan(y)
+    mean_x = np.add.reduceat(x, edges[:-1]) / counts
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_y = np.add.reduceat(np.where(valid, y, 0.0), edges[:-1]) / np.add.reduceat(valid, edges[:-1])
+
+    out = np.empty(points, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - mean_x[i + 1]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (mean_y[i + 1] - ay))
+        a = lo + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        out[i + 1] = a
+    return out
+
+
+def minmax_indices(y, points: int) -> np.ndarray:
+    """
+    Indices of the minimum and maximum of each bucket, fully vectorized.
+
+    Keeps spikes that LTTB may smooth over; about points / 2 buckets.
+    """
+    import numpy as np
+
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if points >= n:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, (points - 2) // 2 + 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    idx = starts[:, None] + np.arange((ends - starts).max())[None, :]
+    inside = idx < ends[:, None]
+    vals = y[np.minimum(idx, n - 1)]
+    usable = inside & ~np.isnan(vals)
+    lo = np.where(usable, vals, np.inf).argmin(axis=1)
+    hi = np.where(usable, vals, -np.inf).argmax(axis=1)
+    return np.unique(np.concatenate(([0], starts + lo, starts + hi, [n - 1])))
+
+
+def _indices(x, y, method: str, points: int) -> np.ndarray:
+    if method == "lttb":
+        return lttb_indices(x, y, points)
+    return minmax_indices(y, points)
+
+
+def _take(trace, idx, n: int):
+    """Keep the points at idx of a trace and its aligned per-point arrays"""
+    import numpy as np
+
+    update = {"x": np.asarray(trace.x)[idx], "y": np.asarray(trace.y)[idx]}
+    for name in _ALIGNED:
+        values = trace[name]
+        if values is not None and not isinstance(values, str) and len(values) == n:
+            update[name] = np.asarray(values)[idx]
+    trace.update(update)
+
+
+def downsample_figure(fig, method: str = "lttb", points: int = DEFAULT_POINTS):
+    """
+    Downsample every line/marker scatter trace with more than `points` points.
+
+    Traces of one stackgroup share a single set of indices, picked from the
+    stack's total, so the stacked layers keep lining up. A stackgroup whose
+    traces do not share the same x values is left alone.
+    """
+    import numpy as np
+
+    stacks = {}
+    for trace in fig.data:
+        if trace.type not in ("scatter", "scattergl") or trace.x is None or trace.y is None:
+            continue
+        n = len(trace.y)
+        if n <= points or len(trace.x) != n:
+            continue
+        if trace.type == "scatter" and trace.stackgroup:
+            stacks.setdefault(trace.stackgroup, []).append(trace)
+            continue
+        _take(trace, _indices(trace.x, trace.y, method, points), n)
+
+    for traces in stacks.values():
+        x = np.asarray(traces[0].x)
+        if any(len(t.y) != len(x) or not np.array_equal(np.asarray(t.x), x) for t in traces[1:]):
+            continue
+        total = np.nansum([np.asarray(t.y, dtype=float) for t in traces], axis=0)
+        idx = _indices(x, total, method, points)
+        for trace in traces:
+            _take(trace, idx, len(x))
+    return fig
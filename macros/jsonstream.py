@@ -0,0 +1,99 @@
+# Incremental parsing of large JSON exports, one array element at a time
+import json
+import re
+from pathlib import Path
+from typing import Iterator, Optional
+
+DEFAULT_CHUNK = 1 << 16
+
+_WS = re.compile(r"\s*")
+_DELIMITERS = ",:]} \t\r\n"
+
+
+class _Reader:
+    """Text buffer over a file that only holds the unconsumed tail plus one chunk"""
+
+    def __init__(self, f, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self) -> bool:
+        """Read another chunk, dropping consumed text; False at end of file"""
+        data = self.f.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character without consuming it ('' at end of file)"""
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos}, found {found!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next JSON value, reading more input until it is complete"""
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number cut off by the chunk boundary ("1." of "1.5") decodes
+                # too early, so only accept values followed by a delimiter
+                if self.eof or (end < len(self.buf) and self.buf[end] in _DELIMITERS):
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill()
+
+
+def iter_json_array(path, key: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK) -> Iterator:
+    """
+    Yield the elements of a JSON array without loading the whole document.
+
+    The array is either the top-level value, or the value of ``key`` in a
+    top-level object (e.g. ``{"facts": [...]}``). Memory use is bounded by
+    the chunk size plus the largest single element.
+    """
+    with open(Path(path), encoding="utf-8") as f:
+        reader = _Reader(f, chunk_size)
+        if reader.peek() == "{" and key is not None:
+            reader.expect("{")
+            while True:
+                char = reader.peek()
+                if char == ",":
+                    reader.expect(",")
+                    continue
+                if char != '"':
+                    raise ValueError(f"No {key!r} array in {path}")
+                name = reader.value()
+                reader.expect(":")
+                if name == key:
+                    break
+                reader.value()  # skip other members
+
+        reader.expect("[")
+        if reader.peek() == "]":
+            return
+        while True:
+            yield reader.value()
+            char = reader.peek()
+            reader.expect(char if char in ",]" else ",")
+            if char == "]":
+                return
@@ -0,0 +1,446 @@
+# Declarative ETL pipelines from the `pipeline:` section of a report config.yml
+#
+# pandas is imported where frames are built, so planning and listing
+# pipelines (scripts/build.py) stays cheap.
+from __future__ import annotations
+
+import os
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+from macros.columnar import write_csv
+from macros.datasets import load_dataset
+from macros.depcache import BuildCache, fingerprint, hash_file, hash_obj
+from macros.jsonstream import iter_json_array
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Source and sink paths are relative to docs/, like report.data
+DOCS_DIR = Path("docs")
+
+# Per-report dependency records: .cache/pipelines/<slug>.json, and the
+# frame after each stage: .cache/pipelines/<slug>/<key>.pkl
+CACHE_DIR = Path(".cache/pipelines")
+
+STAGES = ("filter", "rename", "parse_dates", "cast", "aggregate", "derive")
+FILTER_OPS = ("equals", "in", "not_in", "startswith", "notna")
+AGGREGATES = ("sum", "mean", "min", "max", "count", "first", "last")
+DERIVE_OPS = ("pct_change", "rolling_mean", "diff", "cumsum")
+
+MONTHS_NL = {'Januari':1,'Februari':2,'Maart':3,'April':4,'Mei':5,'Juni':6,
+             'Juli':7,'Augustus':8,'September':9,'Oktober':10,'November':11,'December':12}
+
+
+def parse_nl_months(values: pd.Series) -> pd.Series:
+    """'Januari 2021' -> 2021-01-01, parsed once per distinct label"""
+    import pandas as pd
+
+    labels = values.astype("category")
+    parts = labels.cat.categories.to_series().str.extract(r"^\s*(\w+)\s+(\d{4})\s*$")
+    month = parts[0].str.capitalize().map(MONTHS_NL)
+    bad = month.isna() | parts[1].isna()
+    if bad.any():
+        raise ValueError(f"Unparseable month labels: {list(parts.index[bad])[:5]}")
+    parsed = pd.to_datetime(pd.DataFrame({"year": parts[1].astype(int), "month": month.astype(int), "day": 1}))
+    # Categories are looked up by code, so each distinct label is converted once
+    return pd.Series(parsed.to_numpy()[labels.cat.codes.to_numpy()], index=values.index, name=values.name)
+
+
+@dataclass(frozen=True)
+class Pipeline:
+    """One named chain: a source, ordered stages, and an optional CSV sink"""
+    name: str
+    source: dict
+    steps: Tuple[Tuple[str, dict], ...]
+    sink: Optional[dict] = None
+
+    def spec(self) -> dict:
+        return {"source": self.source, "steps": [list(s) for s in self.steps], "sink": self.sink}
+
+
+def _as_list(value) -> list:
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def parse_pipelines(items: list) -> List[Pipeline]:
+    """Validate a `pipeline:` section and return its pipelines in dependency order"""
+    pipelines = {}
+    for i, item in enumerate(items or []):
+        name = item.get("name") or f"pipeline-{i}"
+        if name in pipelines:
+            raise ValueError(f"Duplicate pipeline name: {name}")
+        source = item.get("source") or {}
+        if sum(k in source for k in ("json", "csv", "pipeline")) != 1:
+            raise ValueError(f"Pipeline '{name}': source needs exactly one of json, csv, pipeline")
+
+        steps = []
+        for step in item.get("steps", []):
+            if not isinstance(step, dict) or len(step) != 1 or next(iter(step)) not in STAGES:
+                raise ValueError(f"Pipeline '{name}': invalid step {step!r}. Available stages: {list(STAGES)}")
+            stage, params = next(iter(step.items()))
+            if stage == "filter" and sum(op in params for op in FILTER_OPS) != 1:
+                raise ValueError(f"Pipeline '{name}': filter needs one of {list(FILTER_OPS)}")
+            if stage == "derive" and params.get("op") not in DERIVE_OPS:
+                raise ValueError(f"Pipeline '{name}': unknown derive op {params.get('op')!r}. Available ops: {list(DERIVE_OPS)}")
+            steps.append((stage, params))
+
+        sink = item.get("sink")
+        if isinstance(sink, str):
+            sink = {"path": sink}
+        pipelines[name] = Pipeline(name, source, tuple(steps), sink)
+
+    # Upstream pipelines first
+    ordered, state = [], {}
+
+    def visit(name, chain=()):
+        if state.get(name) == "done":
+            return
+        if name in chain:
+            raise ValueError(f"Pipeline cycle: {' -> '.join(chain + (name,))}")
+        if name not in pipelines:
+            raise ValueError(f"Unknown pipeline: {name}")
+        upstream = pipelines[name].source.get("pipeline")
+        if upstream:
+            visit(upstream, chain + (name,))
+        state[name] = "done"
+        ordered.append(pipelines[name])
+
+    for name in pipelines:
+        visit(name)
+    return ordered
+
+
+def _mask(df: pd.DataFrame, params: dict) -> pd.Series:
+    """Vectorized filter"""
+    col = df[params["column"]]
+    if "equals" in params:
+        return col == params["equals"]
+    if "in" in params:
+        return col.isin(_as_list(params["in"]))
+    if "not_in" in params:
+        return ~col.isin(_as_list(params["not_in"]))
+    if "startswith" in params:
+        return col.astype(str).str.startswith(str(params["startswith"]), na=False)
+    return col.notna() if params["notna"] else col.isna()
+
+
+def _keep(row: dict, params: dict) -> bool:
+    """Row-level equivalent of _mask, for filters pushed into a streaming source"""
+    value = row.get(params["column"])
+    if "equals" in params:
+        return value == params["equals"]
+    if "in" in params:
+        return value in _as_list(params["in"])
+    if "not_in" in params:
+        return value not in _as_list(params["not_in"])
+    if "startswith" in params:
+        return str(value).startswith(str(params["startswith"]))
+    return (value is not None) == bool(params["notna"])
+
+
+def _aggregations(params: dict) -> List[Tuple[str, str]]:
+    """(column, function) pairs of an aggregate stage, in declaration order"""
+    return [(col, fn) for fn in params if fn in AGGREGATES for col in _as_list(params[fn])]
+
+
+def plan(pipeline: Pipeline) -> Tuple[List[dict], List[Tuple[str, dict]], Optional[Set[str]]]:
+    """
+    Split a pipeline into pushed-down filters, live stages and source columns.
+
+    Leading filters of a JSON source run inside the streaming reader. A
+    backward pass from the sink then drops stages whose output is never used
+    and narrows the columns the source has to materialize (None = all).
+    """
+    steps = list(pipeline.steps)
+    pushdown = []
+    if "json" in pipeline.source:
+        while steps and steps[0][0] == "filter":
+            pushdown.append(steps.pop(0)[1])
+
+    need = set(pipeline.sink["columns"]) if pipeline.sink and pipeline.sink.get("columns") else None
+    live = []
+    for stage, params in reversed(steps):
+        if stage == "filter":
+            if need is not None:
+                need.add(params["column"])
+        elif stage == "rename":
+            if need is not None:
+                inverse = {new: old for old, new in params.items()}
+                need = {inverse.get(c, c) for c in need}
+        elif stage == "parse_dates":
+            target = params.get("to", params["column"])
+            if need is not None:
+                if target not in need:
+                    continue
+                need = (need - {target}) | {params["column"]}
+        elif stage == "cast":
+            if need is not None:
+                params = {c: t for c, t in params.items() if c in need}
+                if not params:
+                    continue
+        elif stage == "derive":
+            if need is not None:
+                if params["column"] not in need:
+                    continue
+                need = (need - {params["column"]}) | {params["from"]} | set(_as_list(params.get("sort_by", [])))
+        elif stage == "aggregate":
+            by = _as_list(params["by"])
+            aggs = [(c, fn) for c, fn in _aggregations(params) if need is None or c in need]
+            params = {"by": by, "aggs": aggs}
+            need = set(by) | {c for c, _ in aggs}
+        live.append((stage, params))
+    live.reverse()
+    return pushdown, live, need
+
+
+def _select(df: pd.DataFrame, columns: Optional[Set[str]], where: str) -> pd.DataFrame:
+    if columns is None:
+        return df
+    missing = columns - set(df.columns)
+    if missing:
+        raise KeyError(f"{where}: missing columns {sorted(missing)}")
+    return df[[c for c in df.columns if c in columns]]
+
+
+def _read_json(path: Path, key: Optional[str], pushdown: List[dict], columns: Optional[Set[str]]) -> pd.DataFrame:
+    """Stream a JSON array, filtering rows and keeping only the needed fields"""
+    import pandas as pd
+
+    rows = (row for row in iter_json_array(path, key=key) if all(_keep(row, f) for f in pushdown))
+    if columns is None:
+        return pd.DataFrame(list(rows))
+    data = {c: [] for c in sorted(columns)}
+    for row in rows:
+        for c, values in data.items():
+            values.append(row.get(c))
+    return pd.DataFrame(data)
+
+
+def _apply(df: pd.DataFrame, stage: str, params: dict) -> pd.DataFrame:
+    import pandas as pd
+
+    if stage == "rename":
+        return df.rename(columns=params)
+    if stage == "parse_dates":
+        col, fmt = params["column"], params.get("format", "ISO8601")
+        values = parse_nl_months(df[col]) if fmt == "nl_month" else pd.to_datetime(df[col], format=fmt)
+        return df.assign(**{params.get("to", col): values})
+    if stage == "cast":
+        cast = {}
+        for col, dtype in params.items():
+            if dtype in ("category", "str", "string", "object"):
+                cast[col] = df[col].astype(dtype)
+            else:
+                cast[col] = pd.to_numeric(df[col].astype(object), errors="coerce").astype(dtype)
+        return df.assign(**cast)
+    if stage == "aggregate":
+        return df.groupby(params["by"], as_index=False).agg({c: fn for c, fn in params["aggs"]})
+    if stage == "derive":
+        if params.get("sort_by"):
+            df = df.sort_values(params["sort_by"])
+        src, op = df[params["from"]], params["op"]
+        if op == "pct_change":
+            values = src.pct_change(periods=params.get("periods", 1))
+        elif op == "rolling_mean":
+            window = params["window"]
+            values = src.rolling(window, min_periods=params.get("min_periods", window)).mean()
+        elif op == "diff":
+            values = src.diff(periods=params.get("periods", 1))
+        else:
+            values = src.cumsum()
+        if "scale" in params:
+            values = values * params["scale"]
+        if "round" in params:
+            values = values.round(params["round"])
+        return df.assign(**{params["column"]: values})
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def _fuse(live: List[Tuple[str, dict]]) -> List[List[Tuple[str, dict]]]:
+    """Group live stages into execution steps; consecutive filters form one step"""
+    steps = []
+    for stage, params in live:
+        if stage == "filter" and steps and steps[-1][0][0] == "filter":
+            steps[-1].append((stage, params))
+        else:
+            steps.append([(stage, params)])
+    return steps
+
+
+def _run_step(df: pd.DataFrame, step: List[Tuple[str, dict]]) -> pd.DataFrame:
+    stage, params = step[0]
+    if stage != "filter":
+        return _apply(df, stage, params)
+    # Consecutive filters fuse into one mask and a single copy
+    mask = _mask(df, params)
+    for _, more in step[1:]:
+        mask &= _mask(df, more)
+    return df[mask]
+
+
+class StageStore:
+    """
+    Frames after each step of a pipeline, pickled under CACHE_DIR/<slug>/.
+
+    A frame is keyed by the source content and the planned steps up to it,
+    so editing a late stage resumes from the last unchanged step instead of
+    re-reading the source.
+    """
+
+    def __init__(self, slug: str):
+        self.dir = CACHE_DIR / slug
+        self.used = set()
+
+    def key(self, base: list, steps: list) -> str:
+        return hash_obj([base, steps])[:24]
+
+    def load(self, key: str) -> Optional[pd.DataFrame]:
+        import pandas as pd
+
+        path = self.dir / f"{key}.pkl"
+        if not path.exists():
+            return None
+        try:
+            df = pd.read_pickle(path)
+        except Exception:
+            return None  # unreadable checkpoint; recompute it
+        self.used.add(key)
+        return df
+
+    def save(self, key: str, df: pd.DataFrame):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.dir / f".{key}.{os.getpid()}.tmp"
+        df.to_pickle(tmp)
+        os.replace(tmp, self.dir / f"{key}.pkl")
+        self.used.add(key)
+
+    def prune(self):
+        """Drop checkpoints no pipeline of this report used or kept"""
+        if self.dir.exists():
+            for path in self.dir.glob("*.pkl"):
+                if path.stem not in self.used:
+                    path.unlink()
+
+
+def execute(pipeline: Pipeline, upstream: Optional[pd.DataFrame] = None,
+            store: Optional[StageStore] = None, source_key: str = "") -> pd.DataFrame:
+    """
+    Run one pipeline; `upstream` is the frame of its source pipeline, if any.
+
+    With a store, the frame after each step is checkpointed and the run
+    resumes from the longest cached prefix. ``source_key`` identifies the
+    source content (file hash or upstream fingerprint).
+    """
+    pushdown, live, columns = plan(pipeline)
+    steps = _fuse(live)
+    base = [pipeline.source, source_key, pushdown, sorted(columns) if columns is not None else None, engine_hash()]
+    keys = [store.key(base, steps[:k]) for k in range(len(steps) + 1)] if store else []
+
+    start, df = 0, None
+    for k in reversed(range(len(keys))):
+        df = store.load(keys[k])
+        if df is not None:
+            start = k
+            break
+
+    if df is None:
+        source = pipeline.source
+        if "json" in source:
+            df = _read_json(DOCS_DIR / source["json"], source.get("key"), pushdown, columns)
+        elif "csv" in source:
+            df = _select(load_dataset(DOCS_DIR / source["csv"]), columns, pipeline.name)
+        else:
+            df = _select(upstream, columns, pipeline.name)
+        if store:
+            store.save(keys[0], df)
+
+    for k in range(start, len(steps)):
+        df = _run_step(df, steps[k])
+        if store:
+            store.save(keys[k + 1], df)
+
+    if pipeline.sink and pipeline.sink.get("columns"):
+        df = df[list(pipeline.sink["columns"])]
+    return df.reset_index(drop=True)
+
+
+@lru_cache(maxsize=None)
+def engine_hash() -> str:
+    """Changes to this module invalidate every cached pipeline"""
+    return hash_file(Path(__file__))
+
+
+def _source_inputs(pipeline: Pipeline, cache: BuildCache, fingerprints: Dict[str, str], by_name: dict) -> dict:
+    source = pipeline.source
+    if "pipeline" in source:
+        upstream = by_name[source["pipeline"]]
+        if upstream.sink:
+            return cache.hasher.digests([DOCS_DIR / upstream.sink["path"]])
+        return {f"pipeline:{upstream.name}": fingerprints[upstream.name]}
+    return cache.hasher.digests([DOCS_DIR / (source.get("json") or source["csv"])])
+
+
+def run_pipelines(items: list, slug: str, force: bool = False) -> List[dict]:
+    """
+    Run the pipelines of one report, skipping those whose spec, inputs and
+    engine are unchanged and whose sink exists.
+
+    Pipelines without a sink are computed only when a stale downstream
+    pipeline needs them. Downstream pipelines read an upstream sink back
+    through load_dataset, so cached and fresh runs see the same frame.
+    A stale pipeline resumes from its last unchanged stage (see StageStore).
+    Returns one {"name", "status", "rows", "seconds"} per pipeline.
+    """
+    pipelines = parse_pipelines(items)
+    by_name = {p.name: p for p in pipelines}
+    cache = BuildCache(CACHE_DIR / f"{slug}.json")
+    store = StageStore(slug)
+    fingerprints, source_keys, frames, results = {}, {}, {}, []
+
+    def frame_of(name: str) -> pd.DataFrame:
+        p = by_name[name]
+        if p.sink:
+            return load_dataset(DOCS_DIR / p.sink["path"])
+        if name not in frames:
+            upstream = p.source.get("pipeline")
+            frames[name] = execute(p, frame_of(upstream) if upstream else None, store, source_keys[name])
+        return frames[name]
+
+    try:
+        for p in pipelines:
+            started = time.perf_counter()
+            deps = {
+                "spec": hash_obj(p.spec()),
+                "engine": engine_hash(),
+                "inputs": _source_inputs(p, cache, fingerprints, by_name),
+            }
+            fp = fingerprints[p.name] = fingerprint(deps)
+            source_keys[p.name] = hash_obj(deps["inputs"])
+            if not p.sink:
+                results.append({"name": p.name, "status": "no sink", "rows": None, "seconds": 0.0})
+                continue
+            sink_path = DOCS_DIR / p.sink["path"]
+            if not force and cache.is_fresh(p.name, fp, sink_path):
+                cache.keep(p.name)
+                meta = cache.lookup(p.name).get("meta") or {}
+                store.used.update(meta.get("stages", []))
+                rows = meta.get("rows")
+                results.append({"name": p.name, "status": "cached", "rows": rows,
+                                "seconds": time.perf_counter() - started})
+                continue
+
+            upstream = p.source.get("pipeline")
+            before = set(store.used)
+            df = execute(p, frame_of(upstream) if upstream else None, None if force else store, source_keys[p.name])
+            write_csv(df, sink_path)
+            cache.record(p.name, fp, deps, meta={"rows": len(df), "stages": sorted(store.used - before)})
+            results.append({"name": p.name, "status": "built", "rows": len(df),
+                            "seconds": time.perf_counter() - started})
+    finally:
+        cache.save()
+        store.prune()
+    return results
@@ -0,0 +1,190 @@
+# Self-hosted plotly.js bundles shared by every generated figure
+import os
+import urllib.request
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Optional
+
+from macros.depcache import hash_text
+
+# Served as /static/js/vendor/ by MkDocs; file names are versioned and
+# content-hashed, so the directory can be cached as immutable.
+VENDOR_DIR = Path("docs/static/js/vendor")
+
+# Downloaded partial bundles; drop plotly-<name>-<version>.min.js files here
+# (e.g. from the plotly.js-<name>-dist-min npm packages) to build offline
+DOWNLOAD_DIR = Path(".cache/plotlyjs")
+PARTIAL_URL = "https://cdn.plot.ly/plotly-{name}-{version}.min.js"
+
+# Values accepted by the --plotlyjs option of the build scripts
+PLOTLYJS_MODES = ("cdn", "local", "partial")
+
+# Official plotly.js partial bundles and the trace types they register,
+# smallest first; the first bundle covering a figure's traces wins
+PARTIAL_BUNDLES = {
+    "basic": {"bar", "pie", "scatter"},
+    "cartesian": {"bar", "box", "contour", "heatmap", "histogram", "histogram2d",
+                  "histogram2dcontour", "image", "pie", "scatter", "scatterternary", "violin"},
+    "finance": {"bar", "candlestick", "funnel", "funnelarea", "histogram", "indicator",
+                "ohlc", "pie", "scatter", "waterfall"},
+    "gl2d": {"parcoords", "scatter", "scattergl", "splom"},
+}
+
+
+@lru_cache(maxsize=None)
+def plotly_bundle(vendor_dir: Path = VENDOR_DIR) -> Path:
+    """
+    Write the plotly.js bundle shipped with the plotly package into the site.
+
+    The file is named ``plotly-<version>.<hash>.min.js`` and only written
+    when missing, so every figure of every build shares one cached URL.
+    """
+    from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+    js = get_plotlyjs()
+    path = Path(vendor_dir) / f"plotly-{get_plotlyjs_version()}.{hash_text(js)[:10]}.min.js"
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(js, encoding="utf-8")
+        os.replace(tmp, path)
+    return path
+
+
+def trace_types(fig) -> set:
+    """Trace types used by a figure"""
+    return {trace.type for trace in fig.data}
+
+
+def select_partial(types: Iterable[str]) -> Optional[str]:
+    """Smallest official partial bundle that registers all types, if any"""
+    types = set(types)
+    for name, supported in PARTIAL_BUNDLES.items():
+        if types <= supported:
+            return name
+    return None
+
+
+def _fetch_partial(name: str, version: str) -> Optional[str]:
+    """Partial bundle source from the download dir or the plotly CDN"""
+    cached = DOWNLOAD_DIR / f"plotly-{name}-{version}.min.js"
+    if not cached.exists():
+        url = PARTIAL_URL.format(name=name, version=version)
+        try:
+            with urllib.request.urlopen(url, timeout=30) as resp:
+                js = resp.read().decode("utf-8")
+        except (OSError, ValueError) as e:
+            print(f"Warning: could not fetch {url} ({e}); using the full plotly.js bundle")
+            return None
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cached.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(js, encoding="utf-8")
+        os.replace(tmp, cached)
+    return cached.read_text(encoding="utf-8")
+
+
+@lru_cache(maxsize=None)
+def partial_bundle(name: str, vendor_dir: Path = VENDOR_DIR) -> Optional[Path]:
+    """
+    Install the named partial bundle next to the full one.
+
+    Returns None when the bundle is not available offline and cannot be
+    downloaded; callers then fall back to the full bundle.
+    """
+    from plotly.offline import get_plotlyjs_version
+
+    version = get_plotlyjs_version()
+    existing = sorted(Path(vendor_dir).glob(f"plotly-{name}-{version}.*.min.js"))
+    if existing:
+        return existing[0]
+
+    js = _fetch_partial(name, version)
+    if js is None:
+        return None
+    path = Path(vendor_dir) / f"plotly-{name}-{version}.{hash_text(js)[:10]}.min.js"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(js, encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+def bundle_for_types(source, types: Iterable[str]):
+    """
+    Resolve the script source for a figure with the given trace types.
+
+    In "partial" mode this picks the smallest partial bundle covering the
+    types; other sources are returned unchanged.
+    """
+    if source != "partial":
+        return source
+    name = select_partial(types)
+    return (partial_bundle(name) if name else None) or plotly_bundle()
+
+
+def bundle_for(source, fig):
+    """Resolve the script source for one figure"""
+    return bundle_for_types(source, trace_types(fig))
+
+
+def bundle_summary(sources: Iterable) -> list:
+    """Summary lines comparing the bundles in use against the full bundle"""
+    used = [Path(s) for s in sources if s and s != "cdn"]
+    if not used:
+        return []
+    full = plotly_bundle().stat().st_size
+    lines = [f"plotly.js full bundle: {full / 1e6:.2f} MB"]
+    for path in sorted(set(used)):
+        size = path.stat().st_size
+        count = used.count(path)
+        lines.append(f"{path.name}: {size / 1e6:.2f} MB ({size / full:.0%} of full) × {count} figure(s)")
+    return lines
+
+
+def relative_src(target: Path, html_path: Path) -> str:
+    """URL of target relative to the page at html_path"""
+    return Path(os.path.relpath(Path(target), Path(html_path).parent)).as_posix()
+
+
+def resolve_plotlyjs(mode: str):
+    """
+    Resolve a --plotlyjs mode to a script source: "cdn" or the bundle path.
+
+    Resolve once in the parent process and pass the result to writers, so
+    worker processes never re-read or re-hash the bundle.
+    """
+    if mode == "cdn":
+        return "cdn"
+    if mode == "local":
+        return plotly_bundle()
+    if mode == "partial":
+        return "partial"  # resolved per figure by bundle_for()
+    raise ValueError(f"Unknown plotly.js mode: {mode}. Available modes: {list(PLOTLYJS_MODES)}")
+
+
+def plotly_version() -> str:
+    """Installed plotly.py version, read from package metadata without importing plotly"""
+    from importlib.metadata import version
+
+    return version("plotly")
+
+
+def cdn_url() -> str:
+    """URL of the full bundle on the plotly CDN, matching the installed version"""
+    from plotly.offline import get_plotlyjs_version
+
+    return f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"
+
+
+def script_url(source, html_path: Path) -> str:
+    """<script src> for a resolved source, for pages not written by plotly"""
+    if source == "cdn":
+        return cdn_url()
+    return relative_src(source, html_path)
+
+
+def include_plotlyjs(source, html_path: Path):
+    """Value for pio.write_html(include_plotlyjs=...) for a resolved source"""
+    if source == "cdn":
+        return "cdn"
+    return relative_src(source, html_path)
@@ -0,0 +1,223 @@
+# Make-style task graph for scripts/build.py: declared inputs and outputs,
+# up-to-date checks against a BuildCache, ready tasks run concurrently
+import contextlib
+import glob
+import io
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+from macros.depcache import BuildCache, fingerprint, hash_obj
+
+# What an action returns. PARTIAL: usable results, but some items failed;
+# dependents still run and the task is retried once its inputs change.
+DONE, PARTIAL, FAILED = "done", "partial", "failed"
+
+Paths = Union[Sequence[str], Callable[[], Iterable[str]]]
+
+
+@dataclass
+class Task:
+    """
+    One build step.
+
+    ``inputs`` and ``outputs`` are glob patterns (``**`` recurses), or a
+    function returning paths when they come from a config file. Paths
+    ending in one of ``exclude`` are ignored on both sides. ``action`` must
+    be a module-level function so it can run in a worker process.
+    """
+    name: str
+    action: Callable[..., str]
+    inputs: Paths = ()
+    outputs: Paths = ()
+    deps: Sequence[str] = ()
+    args: dict = field(default_factory=dict)
+    exclude: Sequence[str] = ()
+    description: str = ""
+
+
+def expand(paths: Paths, exclude: Sequence[str] = ()) -> List[str]:
+    """Existing files matching the patterns (or returned by the function), sorted"""
+    patterns = paths() if callable(paths) else paths
+    found = set()
+    for pattern in patterns:
+        for match in glob.glob(str(pattern), recursive=True):
+            if os.path.isfile(match) and not match.endswith(tuple(exclude)):
+                found.add(Path(match).as_posix())
+    return sorted(found)
+
+
+def run_action(action: Callable[..., str], args: dict) -> dict:
+    """Run an action with its output captured; never raises"""
+    log = io.StringIO()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            status = action(**args)
+            error = None
+        except BaseException as e:  # SystemExit from a stage's main() included
+            status, error = FAILED, f"{type(e).__name__}: {e}"
+    if status not in (DONE, PARTIAL, FAILED):
+        status, error = FAILED, f"action returned {status!r}"
+    return {"status": status, "error": error, "log": log.getvalue(),
+            "seconds": time.perf_counter() - started}
+
+
+class TaskGraph:
+    """
+    Tasks keyed by name, run in dependency order.
+
+    A task is up to date when its input hashes and action match the last
+    done or partial run and every output it wrote still has the recorded
+    hash; rerunning a partial task on the same inputs would fail the same way.
+    Inputs are hashed only once the task's dependencies have finished, so
+    an upstream output that changed makes its dependents stale.
+    """
+
+    def __init__(self, tasks: Sequence[Task], cache_path: Path):
+        self.tasks: Dict[str, Task] = {t.name: t for t in tasks}
+        self.cache = BuildCache(cache_path)
+        for task in tasks:
+            unknown = [d for d in task.deps if d not in self.tasks]
+            if unknown:
+                raise ValueError(f"Task '{task.name}' depends on unknown task(s): {', '.join(unknown)}")
+
+    def closure(self, targets: Sequence[str]) -> List[str]:
+        """Targets and everything they depend on, dependencies first"""
+        order, visiting = [], set()
+
+        def visit(name, chain=()):
+            if name not in self.tasks:
+                raise ValueError(f"Unknown task '{name}' (known: {', '.join(self.tasks)})")
+            if name in chain:
+                raise ValueError(f"Dependency cycle: {' -> '.join(chain + (name,))}")
+            if name in visiting:
+                return
+            visiting.add(name)
+            for dep in self.tasks[name].deps:
+                visit(dep, chain + (name,))
+            order.append(name)
+
+        for target in targets:
+            visit(target)
+        return order
+
+    def _deps(self, task: Task) -> dict:
+        return {
+            "inputs": self.cache.hasher.digests(expand(task.inputs, task.exclude)),
+            "action": hash_obj([task.action.__module__, task.action.__qualname__, task.args]),
+        }
+
+    def stale(self, task: Task, deps: dict) -> List[str]:
+        """Why the task has to run; empty when it is up to date"""
+        record = self.cache.lookup(task.name)
+        if not record or record.get("fingerprint") != fingerprint(deps):
+            return self.cache.changed(task.name, deps) or ["new"]
+        outputs = record.get("meta", {}).get("outputs", {})
+        return [f"{p} changed" for p, h in outputs.items() if self.cache.hasher.digest(p) != h]
+
+    def _record(self, task: Task, deps: dict, partial: bool = False):
+        meta = {"outputs": self.cache.hasher.digests(expand(task.outputs, task.exclude))}
+        if partial:
+            meta["partial"] = True
+        self.cache.record(task.name, fingerprint(deps), deps, meta=meta)
+
+    def plan(self, targets: Sequence[str], force: bool = False) -> Dict[str, List[str]]:
+        """
+        Reasons each task would run, without running anything.
+
+        Tasks are checked against the inputs on disk now. A task that is up
+        to date but depends on one that runs is listed as "after <dep>": it
+        runs only if that dependency changes one of its inputs.
+        """
+        reasons = {}
+        for name in self.closure(targets):
+            task = self.tasks[name]
+            reasons[name] = ["forced"] if force else self.stale(task, self._deps(task))
+            if not reasons[name]:
+                reasons[name] = [f"after {d}" for d in task.deps if reasons.get(d)]
+        return reasons
+
+    def run(self, targets: Sequence[str], jobs: int = 1, force: bool = False,
+            report: Optional[Callable[[str, dict], None]] = None) -> Dict[str, dict]:
+        """
+        Bring targets up to date; returns {name: outcome} in completion order.
+
+        An outcome has "status" (done, partial, failed, up to date or
+        blocked), "reasons", "seconds", "log" and "error". ``report`` is
+        called with each outcome as soon as it is known.
+        """
+        order = self.closure(targets)
+        outcomes: Dict[str, dict] = {}
+        waiting = list(order)
+        running = {}
+
+        def finish(name, outcome):
+            outcomes[name] = outcome
+            if report:
+                report(name, outcome)
+
+        def ready():
+            """Start or settle every task whose dependencies have finished"""
+            progressed = True
+            while progressed:
+                progressed = False
+                for name in list(waiting):
+                    task = self.tasks[name]
+                    if not all(d in outcomes for d in task.deps):
+                        continue
+                    waiting.remove(name)
+                    progressed = True
+                    failed = [d for d in task.deps if outcomes[d]["status"] in (FAILED, "blocked")]
+                    if failed:
+                        finish(name, {"status": "blocked", "reasons": [f"{d} failed" for d in failed],
+                                      "seconds": 0.0, "log": "", "error": None})
+                        continue
+                    deps = self._deps(task)
+                    reasons = ["forced"] if force else self.stale(task, deps)
+                    if not reasons:
+                        self.cache.keep(name)
+                        partial = (self.cache.lookup(name).get("meta") or {}).get("partial")
+                        finish(name, {"status": "up to date", "seconds": 0.0, "log": "", "error": None,
+                                      "reasons": ["partial, inputs unchanged"] if partial else []})
+                        continue
+                    yield name, deps, reasons
+
+        def settle(name, deps, reasons, result):
+            if result["status"] in (DONE, PARTIAL):
+                self._record(self.tasks[name], deps, partial=result["status"] == PARTIAL)
+            finish(name, dict(result, reasons=reasons))
+
+        try:
+            if jobs <= 1:
+                for name, deps, reasons in ready():
+                    task = self.tasks[name]
+                    settle(name, deps, reasons, run_action(task.action, task.args))
+                return outcomes
+
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                while waiting or running:
+                    for name, deps, reasons in ready():
+                        task = self.tasks[name]
+                        running[pool.submit(run_action, task.action, task.args)] = (name, deps, reasons)
+                    if not running:
+                        break
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name, deps, reasons = running.pop(future)
+                        try:
+                            result = future.result()
+                        except Exception as e:  # worker crashed or result failed to unpickle
+                            result = {"status": FAILED, "error": str(e), "log": "", "seconds": 0.0}
+                        settle(name, deps, reasons, result)
+            return outcomes
+        finally:
+            # Tasks that did not run keep their record; failed runs drop
+            # theirs so they run again next time
+            for name in self.cache.recorded():
+                if name not in outcomes or outcomes[name]["status"] == "blocked":
+                    self.cache.keep(name)
+            self.cache.save()
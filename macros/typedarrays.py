@@ -0,0 +1,119 @@
+# Compact figure data: base64 typed arrays, numeric dates and shared x/y arrays
+import base64
+import re
+from typing import Optional
+
+import numpy as np
+
+# plotly.js decodes {dtype, bdata} typed array specs from 2.28.0 on
+MIN_PLOTLYJS = (2, 28)
+
+# Trace arrays that are encoded (and deduplicated across traces)
+ARRAY_KEYS = ("x", "y")
+
+# Date-only strings as written by macros.charts.compact_dates
+_DAY = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+# Integer typed arrays plotly.js accepts, smallest first
+_INT_DTYPES = ("i1", "u1", "i2", "u2", "i4", "u4")
+
+# Rehydrates {"shared": i} references to trace i's array before plotting.
+# Keep in sync with docs/static/js/chart-loader.js.
+HYDRATE_JS = (
+    "function (id, data, layout, config) {"
+    " data.forEach(function (t) { [\"x\", \"y\"].forEach(function (k) {"
+    " if (t[k] && t[k].shared !== undefined) t[k] = data[t[k].shared][k]; }); });"
+    " return Plotly.newPlot(id, data, layout, config); }"
+)
+
+
+def supported(version: Optional[str] = None) -> bool:
+    """True when the plotly.js version (default: the bundled one) decodes typed arrays"""
+    if version is None:
+        from plotly.offline import get_plotlyjs_version
+
+        version = get_plotlyjs_version()
+    return tuple(int(part) for part in version.split(".")[:2]) >= MIN_PLOTLYJS
+
+
+def _as_array(values) -> np.ndarray:
+    """
+    Values as an ndarray, decoding typed array specs plotly.py already made
+    and reading YYYY-MM-DD strings as dates.
+    """
+    if isinstance(values, dict) and "bdata" in values:
+        arr = np.frombuffer(base64.b64decode(values["bdata"]), dtype=values["dtype"])
+        return arr.reshape(values["shape"]) if "shape" in values else arr
+    arr = np.asarray(values)
+    if arr.ndim == 1 and len(arr) and arr.dtype.kind in "UO" and all(
+        v is None or (isinstance(v, str) and _DAY.match(v)) for v in arr
+    ):
+        return arr.astype("datetime64[D]")
+    return arr
+
+
+def _narrow(arr: np.ndarray, precision: Optional[int]) -> np.ndarray:
+    """Smallest typed array holding the (rounded) values"""
+    if precision is not None:
+        arr = np.round(arr, precision)
+    finite = np.isfinite(arr)
+    if finite.all() and len(arr) and np.array_equal(arr, np.trunc(arr)):
+        for dtype in _INT_DTYPES:
+            info = np.iinfo(dtype)
+            if info.min <= arr.min() and arr.max() <= info.max:
+                return arr.astype(dtype)
+    if precision is not None:
+        as_f4 = arr.astype("f4")
+        if np.all(np.abs(as_f4[finite] - arr[finite]) <= 0.5 * 10.0 ** -precision):
+            return as_f4
+    return arr.astype("f8")
+
+
+def encode_array(values, precision: Optional[int] = None):
+    """
+    Typed array spec ({"dtype", "bdata"}) for numeric or datetime values.
+
+    Dates become milliseconds since the epoch (NaT as NaN), which a date
+    axis reads like date strings. Returns None for anything else (strings,
+    categories, mixed objects), which is left as a JSON list.
+    """
+    arr = _as_array(values)
+    if arr.ndim != 1:
+        return None
+    if arr.dtype.kind == "M":
+        ms = arr.astype("datetime64[ms]")
+        arr = np.where(np.isnat(ms), np.nan, ms.astype("int64").astype("f8"))
+        precision = 0
+    elif arr.dtype.kind in "iub":
+        arr = arr.astype("f8")
+    elif arr.dtype.kind != "f":
+        return None
+    arr = _narrow(arr.astype("f8"), precision)
+    return {"dtype": arr.dtype.str.lstrip("<>|="), "bdata": base64.b64encode(arr.tobytes()).decode("ascii")}
+
+
+def encode_figure(fig, precision: Optional[int] = None) -> dict:
+    """
+    Figure dict with x/y arrays as typed arrays, for pio.to_html / to_json.
+
+    An array equal to the same key of an earlier trace is replaced by
+    {"shared": <trace index>}, which HYDRATE_JS (or the chart loader)
+    resolves in the browser. Axes carrying encoded dates get type "date".
+    """
+    fig_dict = fig.to_plotly_json()
+    layout = fig_dict.setdefault("layout", {})
+    seen = {}
+    for i, trace in enumerate(fig_dict.get("data", [])):
+        for key in ARRAY_KEYS:
+            if trace.get(key) is None:
+                continue
+            is_date = _as_array(trace[key]).dtype.kind == "M"
+            spec = encode_array(trace[key], precision)
+            if spec is None:
+                continue
+            if is_date:
+                axis = trace.get(f"{key}axis", key)
+                layout.setdefault(f"{key}axis{axis[1:]}", {}).setdefault("type", "date")
+            first = seen.setdefault((key, spec["dtype"], spec["bdata"]), i)
+            trace[key] = spec if first == i else {"shared": first}
+    return fig_dict
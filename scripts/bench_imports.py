@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Measure cold-start import cost of the build scripts and macros.
+
+Usage:
+    python scripts/bench_imports.py
+    python scripts/bench_imports.py --repeat 5 --top 8
+
+Runs each entry point in a fresh interpreter with `python -X importtime`
+and reports the best wall time, total import time, and whether pandas,
+plotly and numpy were loaded. Run it with warm chart and report caches
+(build once first) so the scripts measure their fully cached path.
+--top lists the most expensive top-level imports of each entry point.
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+HEAVY = ("pandas", "plotly", "numpy")
+
+# "import time: self [us] | cumulative | imported package"
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def entry_points():
+    """(label, argv) for each measured entry point"""
+    configs = sorted(Path("docs/reports").glob("*/config.yml"))
+    points = [
+        ("mkdocs macros (main.py)", ["-c", "import main"]),
+        ("import macros.charts", ["-c", "import macros.charts"]),
+        ("build_charts.py", ["scripts/build_charts.py"]),
+        ("validate_assets.py", ["scripts/validate_assets.py"]),
+    ]
+    if configs:
+        points.append(("validate_report.py", ["scripts/validate_report.py", str(configs[0])]))
+    return points
+
+
+def parse_importtime(stderr: str):
+    """Top-level imports as {module: cumulative µs}, and every module imported"""
+    top, modules = {}, set()
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if not m:
+            continue
+        _, cumulative, indent, name = m.groups()
+        modules.add(name)
+        if len(indent) <= 1:
+            top[name] = int(cumulative)
+    return top, modules
+
+
+def measure(argv, repeat: int) -> dict:
+    """Best wall time over repeat runs, with the import profile of the last run"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", *argv], cwd=ROOT,
+                              capture_output=True, text=True)
+        best = min(best, time.perf_counter() - start)
+    top, modules = parse_importtime(proc.stderr)
+    return {"seconds": best, "import_ms": sum(top.values()) / 1000, "top": top,
+            "heavy": {name: name in modules for name in HEAVY}, "returncode": proc.returncode}
+
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Measure cold-start import cost with -X importtime")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per entry point; the best wall time is reported")
+    parser.add_argument("--top", type=int, default=0, help="also list this many slowest top-level imports per entry point")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    print(f"{'entry point':<26} {'wall s':>7} {'imports ms':>11}  " + "  ".join(f"{h:<6}" for h in HEAVY))
+    for label, argv in entry_points():
+        result = measure(argv, args.repeat)
+        flags = "  ".join(f"{'yes' if result['heavy'][h] else '-':<6}" for h in HEAVY)
+        failed = "" if result["returncode"] == 0 else f"  (exit {result['returncode']})"
+        print(f"{label:<26} {result['seconds']:>7.2f} {result['import_ms']:>11.0f}  {flags}{failed}")
+        for name, us in sorted(result["top"].items(), key=lambda kv: -kv[1])[:args.top]:
+            print(f"    {name:<40} {us / 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Benchmark the bouwbedrijven ETL: row-wise (legacy) vs vectorized transforms.
+
+Usage:
+    python scripts/bench_json_to_csv.py
+    python scripts/bench_json_to_csv.py --scale 20 --repeat 5
+    python scripts/bench_json_to_csv.py --scale 20 --memory   # full load vs --stream
+
+--scale replicates the raw facts with shifted years to simulate a longer
+export. Both versions must produce identical frames; rows/sec is measured
+on the transform only (the JSON is loaded once up front).
+
+--memory also writes the scaled monthly export to a temporary file and
+compares time and peak traced memory of the full-load and streaming paths.
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+from json_to_csv_bouwbedrijven import (
+    RAW_DIR, load_json, monthly, monthly_totals, rename_m, rename_y, stream_facts, yearly,
+)
+
+
+# Row-wise implementation the ETL used before it was vectorized, kept as the baseline
+def legacy_to_datetime_nl(maand_str):
+    mapping = {'Januari':'January','Februari':'February','Maart':'March','April':'April','Mei':'May','Juni':'June',
+               'Juli':'July','Augustus':'August','September':'September','Oktober':'October','November':'November','December':'December'}
+    s = maand_str
+    for nl,en in mapping.items(): s = s.replace(nl, en)
+    return pd.to_datetime(s, format="%B %Y")
+
+
+def legacy_keep_gewest(v): return v not in ["Buitenland", "Onbekend"]
+
+
+def legacy_monthly(facts):
+    maand = pd.DataFrame(facts)
+    if "Sectie" in maand: maand = maand[maand["Sectie"].astype(str).str.startswith("F")]
+    maand = maand.rename(columns=rename_m)
+    maand = maand[maand["Gewest"].apply(legacy_keep_gewest)].copy()
+    maand["Datum"] = maand["Maand"].apply(legacy_to_datetime_nl)
+    return maand.groupby("Datum", as_index=False)[["Starters","Stoppers","Totaal_ondernemingen"]].sum()
+
+
+def legacy_yearly(facts):
+    jaar = pd.DataFrame(facts)
+    if "Sectie" in jaar: jaar = jaar.dropna(subset=["Sectie"])
+    if "Sectie" in jaar: jaar = jaar[jaar["Sectie"].astype(str).str.startswith("F")]
+    jaar = jaar.rename(columns=rename_y)
+    jaar = jaar[jaar["Gewest"].apply(legacy_keep_gewest)].copy()
+    jaar["Jaar"] = pd.to_numeric(jaar["Jaar"], errors="coerce").astype("Int64")
+    return jaar.groupby("Jaar", as_index=False)[["Starters","Stoppers","Totaal_ondernemingen"]].sum()
+
+
+def scale_facts(facts, scale: int, key: str):
+    """Replicate facts into earlier, non-overlapping years (the year is the last word of `key`)"""
+    years = [int(str(fact[key]).rpartition(" ")[2]) for fact in facts]
+    span = max(years) - min(years) + 1
+    out = list(facts)
+    for k in range(1, scale):
+        for fact in facts:
+            fact = dict(fact)
+            head, _, year = str(fact[key]).rpartition(" ")
+            year = str(int(year) - span * k)
+            fact[key] = f"{head} {year}" if head else year
+            out.append(fact)
+    return out
+
+
+def best_of(fn, facts, repeat: int):
+    """Best wall time of `repeat` runs, and the last result"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(facts)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def traced(fn, *args):
+    """Wall time and peak traced memory of one call"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def compare_memory(facts):
+    """Full json.load + DataFrame vs streaming ingest of the same export"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "maandcijfers.json"
+        path.write_text(json.dumps({"facts": facts}), encoding="utf-8")
+        size = path.stat().st_size
+        full_s, full_peak, expected = traced(lambda: monthly(load_json(path)))
+        stream_s, stream_peak, actual = traced(lambda: monthly_totals(stream_facts(path, rename_m)))
+    pd.testing.assert_frame_equal(actual, expected)
+    print(f"\nmaandcijfers export: {size / 1e6:.1f} MB")
+    print(f"  full load: {full_s:6.2f}s, peak {full_peak / 1e6:7.1f} MB")
+    print(f"  --stream:  {stream_s:6.2f}s, peak {stream_peak / 1e6:7.1f} MB")
+
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Benchmark the bouwbedrijven JSON to CSV transforms")
+    parser.add_argument("--scale", type=int, default=1, help="replicate the raw facts this many times")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per variant; the best is reported")
+    parser.add_argument("--memory", action="store_true", help="compare peak memory of full-load and --stream ingest")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    datasets = [
+        ("maandcijfers", scale_facts(load_json(RAW_DIR / "maandcijfers.json"), args.scale, "Maand"),
+         legacy_monthly, monthly),
+        ("jaarcijfers", scale_facts(load_json(RAW_DIR / "jaarcijfers.json"), args.scale, "Jaar"),
+         legacy_yearly, yearly),
+    ]
+
+    print(f"{'dataset':<14} {'rows':>9} {'legacy rows/s':>14} {'vectorized rows/s':>18} {'speedup':>8}")
+    for name, facts, legacy, vectorized in datasets:
+        legacy_s, expected = best_of(legacy, facts, args.repeat)
+        vector_s, actual = best_of(vectorized, facts, args.repeat)
+        pd.testing.assert_frame_equal(actual.reset_index(drop=True), expected.reset_index(drop=True))
+        rows = len(facts)
+        print(f"{name:<14} {rows:>9,} {rows / legacy_s:>14,.0f} {rows / vector_s:>18,.0f} {legacy_s / vector_s:>7.1f}x")
+
+    if args.memory:
+        compare_memory(datasets[0][1])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark SVG vs WebGL line traces to pick charts.webgl_threshold.
+
+Usage:
+    python scripts/bench_webgl.py
+    python scripts/bench_webgl.py --sizes 1000,5000,50000 --series 3
+    python scripts/bench_webgl.py --out /tmp/webgl-bench    # also write the HTML pages
+
+Builds a line_multi chart over synthetic daily series of each size, as SVG
+(webgl: false), WebGL (webgl: true) and LTTB-downsampled to --points, and
+records rendered points, trace type, figure JSON bytes, HTML bytes and build
+time. Browser render time cannot be measured here; open the pages written
+with --out to compare how they draw.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+# Add the project root to Python path so we can import macros
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from macros.charts import build, rendered_points
+
+
+def synthetic_series(path: Path, size: int, series: int):
+    """Write `series` noisy seasonal daily columns of `size` points ending today"""
+    rng = np.random.default_rng(size)
+    t = np.arange(size)
+    df = pd.DataFrame({"Datum": pd.date_range(end=pd.Timestamp.today().normalize(), periods=size, freq="D")})
+    for i in range(series):
+        df[f"Reeks {i + 1}"] = (100 + 20 * np.sin(2 * np.pi * t / 365.25 + i) + rng.normal(0, 5, size).cumsum() / 10).round(1)
+    df.to_csv(path, index=False)
+    return [c for c in df.columns if c != "Datum"]
+
+
+def measure(label: str, size: int, **params):
+    """One benchmark row for a chart built with params"""
+    start = time.perf_counter()
+    fig = build("line_multi", **params)
+    seconds = time.perf_counter() - start
+    html = pio.to_html(fig, include_plotlyjs=False, full_html=True)
+    return {
+        "size": size,
+        "variant": label,
+        "traces": "/".join(sorted({t.type for t in fig.data})),
+        "points": rendered_points(fig),
+        "json_bytes": len(fig.to_json().encode()),
+        "html_bytes": len(html.encode()),
+        "build_s": round(seconds, 3),
+        "html": html,
+    }
+
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Benchmark SVG vs WebGL line traces")
+    parser.add_argument("--sizes", default="1000,5000,20000,100000", help="comma-separated points per series")
+    parser.add_argument("--series", type=int, default=2, help="series (traces) per chart")
+    parser.add_argument("--points", type=int, default=1000, help="LTTB target points for the downsampled variant")
+    parser.add_argument("--csv", help="also write the results to this CSV file")
+    parser.add_argument("--out", help="write each variant's HTML page to this directory")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+    out = Path(args.out) if args.out else None
+    if out:
+        out.mkdir(parents=True, exist_ok=True)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            data_path = Path(tmp) / f"series_{size}.csv"
+            ys = synthetic_series(data_path, size, args.series)
+            base = dict(data_path=str(data_path), x="Datum", ys=ys, title=f"{size} punten")
+            variants = [
+                ("svg", dict(base, webgl=False)),
+                ("webgl", dict(base, webgl=True)),
+                (f"lttb-{args.points}", dict(base, downsample=args.points)),
+            ]
+            for label, params in variants:
+                row = measure(label, size, **params)
+                if out:
+                    (out / f"{size}-{label}.html").write_text(row["html"], encoding="utf-8")
+                rows.append(row)
+
+    table = pd.DataFrame(rows).drop(columns=["html"])
+    print(table.to_string(index=False))
+    if args.csv:
+        table.to_csv(args.csv, index=False)
+        print(f"\n📄 Results written to {args.csv}")
+    if out:
+        print(f"🌐 Pages written to {out}/ (open them to compare render time)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Build the whole site as one task graph.
+
+Usage:
+    python scripts/build.py                      # everything, up to the compressed site
+    python scripts/build.py charts reports       # only these tasks (and what they depend on)
+    python scripts/build.py --jobs 0             # independent tasks in parallel, one worker per CPU
+    python scripts/build.py --dry-run            # list what would run and why
+    python scripts/build.py --force site         # rebuild even when up to date
+
+Tasks and what they read and write:
+
+    pipeline   report ETL (run_pipeline.py)     raw sources   -> report CSVs
+    charts     build_charts.py                  charts.yml    -> docs/assets/<slug>/
+    reports    build_all_reports.py             config.yml    -> chart HTML + asset.yml
+    validate   validate_assets.py               asset.yml files
+    site       mkdocs build --strict --clean    docs/         -> site/ (asset pages come
+                                                                 from gen_assets_pages.py)
+    compress   compress_assets.py               site/         -> .gz/.br siblings
+
+A task runs when one of its inputs, its options or one of the outputs it
+wrote last time changed, and is skipped otherwise. Inputs are hashed once
+a task's dependencies have finished, so new pipeline CSVs make charts and
+reports stale within the same run. State is kept in .cache/build.json;
+each stage keeps its own finer-grained cache as well.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import yaml
+
+# Add the project root to Python path so we can import macros
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from build_report import LEGACY_MODES
+from macros.plotlyjs import PLOTLYJS_MODES
+from macros.taskgraph import DONE, FAILED, PARTIAL, Task, TaskGraph
+
+CACHE_FILE = Path(".cache") / "build.json"
+COMPRESSED = (".gz", ".br")
+BUILDER_CODE = ["macros/**/*.py", "docs/_data/site.yml"]
+STATUS_ICONS = {DONE: "✅", PARTIAL: "⚠️ ", FAILED: "❌", "up to date": "✓ ", "blocked": "⏭️ "}
+
+
+def _load(path: Path) -> dict:
+    try:
+        return yaml.safe_load(path.read_text()) or {}
+    except (OSError, yaml.YAMLError):
+        return {}  # the stage itself reports the broken file
+
+
+def pipeline_files(kind: str) -> list:
+    """Source ("inputs") or sink ("outputs") files of every report pipeline"""
+    from run_pipeline import find_pipeline_configs
+
+    paths = []
+    for config in find_pipeline_configs():
+        conf = _load(config)
+        if kind == "inputs":
+            paths.append(config)
+        for item in conf.get("pipeline", []):
+            if kind == "inputs":
+                source = item.get("source") or {}
+                paths += [Path("docs") / source[k] for k in ("json", "csv") if k in source]
+            elif item.get("sink"):
+                sink = item["sink"]
+                paths.append(Path("docs") / (sink if isinstance(sink, str) else sink["path"]))
+    return paths
+
+
+def chart_inputs() -> list:
+    """charts.yml, builder code and the data each chart reads"""
+    import build_charts
+
+    return BUILDER_CODE + ["scripts/build_charts.py"] + build_charts.watch_targets()["charts"]
+
+
+def chart_outputs() -> list:
+    """Output file of every chart in charts.yml"""
+    from build_charts import SPEC_PATHS
+
+    return [item["output"] for p in SPEC_PATHS for item in _load(Path(p)).get("charts", []) if "output" in item]
+
+
+def report_inputs() -> list:
+    """Report configs, builder code and the data each report chart reads"""
+    import build_charts
+
+    files = BUILDER_CODE + ["scripts/build_report.py", "scripts/build_all_reports.py"]
+    for inputs in build_charts.watch_targets()["reports"].values():
+        files += inputs
+    return files
+
+
+def report_outputs() -> list:
+    """Report chart folders and their legacy assets/<slug>-<id>/ copies"""
+    from build_all_reports import find_report_configs
+
+    patterns = []
+    for config in find_report_configs():
+        report = _load(config).get("report", {})
+        if "output_dir" in report:
+            patterns.append(f"docs/{report['output_dir']}/**")
+        for spec in _load(config).get("charts", []):
+            patterns.append(f"docs/assets/{report.get('slug')}-{spec.get('id')}/*")
+    return patterns
+
+
+def run_pipeline_task() -> str:
+    from run_pipeline import find_pipeline_configs, run_config
+
+    configs = find_pipeline_configs()
+    if not configs:
+        print("📭 No report configs with a pipeline section found")
+    return DONE if all([run_config(c) for c in configs]) else FAILED
+
+
+def build_charts_task(jobs: int, plotlyjs_mode: str) -> str:
+    from build_charts import build_all
+
+    result = build_all(jobs=jobs, plotlyjs_mode=plotlyjs_mode)
+    return PARTIAL if result["failed"] else DONE
+
+
+def build_reports_task(jobs: int, plotlyjs_mode: str, legacy: str) -> str:
+    from build_all_reports import build_all_reports
+
+    result = build_all_reports(plotlyjs_mode=plotlyjs_mode, legacy=legacy, jobs=jobs)
+    if not result["failed"]:
+        return DONE
+    return PARTIAL if len(result["failed"]) < result["total"] else FAILED
+
+
+def validate_task(jobs: int) -> str:
+    from validate_assets import validate_assets
+
+    report = validate_assets(Path("docs"), jobs=jobs)
+    errors = 0
+    for r in report:
+        problems = ([f"Failed to process: {r['failed']}"] if r["failed"] else []) + r["errors"]
+        errors += len(problems)
+        for problem in problems:
+            print(f"  ❌ {r['path']}: {problem}")
+    print(f"🔍 {len(report)} asset file(s), {errors} error(s)")
+    return FAILED if errors else DONE
+
+
+def mkdocs_task(strict: bool) -> str:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")])))
+    cmd = [sys.executable, "-m", "mkdocs", "build", "--clean"] + (["--strict"] if strict else [])
+    proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+    print(proc.stdout + proc.stderr, end="")
+    return DONE if proc.returncode == 0 else FAILED
+
+
+def compress_task(jobs: int, use_brotli: bool) -> str:
+    from compress_assets import ENCODINGS, compress_assets, print_report
+
+    start = time.perf_counter()
+    totals = compress_assets(["site"], use_brotli=use_brotli, jobs=jobs)
+    print_report(totals, ENCODINGS if use_brotli else ("gz",), time.perf_counter() - start)
+    return DONE
+
+
+def build_tasks(args) -> list:
+    """The task graph, with options from the command line"""
+    return [
+        Task("pipeline", run_pipeline_task,
+             inputs=lambda: pipeline_files("inputs") + ["scripts/run_pipeline.py", "macros/pipeline.py"],
+             outputs=lambda: pipeline_files("outputs"),
+             description="report ETL pipelines"),
+        Task("charts", build_charts_task, deps=["pipeline"],
+             inputs=chart_inputs, outputs=chart_outputs,
+             args={"jobs": args.jobs, "plotlyjs_mode": args.plotlyjs},
+             description="charts from docs/_data/charts.yml"),
+        Task("reports", build_reports_task, deps=["pipeline"],
+             inputs=report_inputs, outputs=report_outputs,
+             args={"jobs": args.jobs, "plotlyjs_mode": args.plotlyjs, "legacy": args.legacy},
+             description="report charts and their asset.yml files"),
+        Task("validate", validate_task, deps=["charts", "reports"],
+             inputs=["docs/assets/**/asset.yml", "scripts/validate_assets.py"],
+             args={"jobs": args.jobs}, description="asset.yml schema and file references"),
+        Task("site", mkdocs_task, deps=["validate"],
+             inputs=["docs/**", "mkdocs.yml", "main.py", "templates/**", "scripts/gen_assets_pages.py", "macros/**/*.py"],
+             outputs=["site/**"], exclude=COMPRESSED + (".pyc",),
+             args={"strict": not args.no_strict}, description="MkDocs site, asset pages included"),
+        Task("compress", compress_task, deps=["site"],
+             inputs=["site/**"], outputs=[f"site/**/*{ext}" for ext in COMPRESSED],
+             exclude=(".pyc",), args={"jobs": args.jobs, "use_brotli": args.brotli},
+             description="pre-compressed .gz/.br siblings"),
+    ]
+
+
+def print_outcome(name: str, outcome: dict):
+    """One block per finished task: status line, then the task's own output"""
+    status = outcome["status"]
+    why = f" ({', '.join(outcome['reasons'][:3])}{', …' if len(outcome['reasons']) > 3 else ''})" if outcome["reasons"] else ""
+    timing = f" {outcome['seconds']:.2f}s" if outcome["seconds"] else ""
+    print(f"{STATUS_ICONS.get(status, '•')} {name}: {status}{timing}{why}")
+    for line in outcome["log"].splitlines():
+        print(f"    {line}")
+    if outcome["error"]:
+        print(f"    ❌ {outcome['error']}")
+
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Build the site as a task graph, skipping up-to-date tasks")
+    parser.add_argument("targets", nargs="*", help="tasks to bring up to date (default: all)")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="tasks run in parallel, also passed to each stage (0 = one per CPU)")
+    parser.add_argument("-n", "--dry-run", action="store_true", help="show which tasks would run and why")
+    parser.add_argument("--force", action="store_true", help="run the selected tasks even when up to date")
+    parser.add_argument("--list", action="store_true", help="list the tasks and exit")
+    parser.add_argument("--plotlyjs", choices=PLOTLYJS_MODES, default="cdn",
+                        help="plotly.js delivery for charts and reports")
+    parser.add_argument("--legacy", choices=LEGACY_MODES, default="link",
+                        help="legacy assets/{slug}-{id}/ copies of report charts")
+    parser.add_argument("--brotli", action="store_true", help="also write .br siblings (requires brotli)")
+    parser.add_argument("--no-strict", action="store_true", help="run mkdocs build without --strict")
+    args = parser.parse_args(argv)
+    args.jobs = args.jobs or os.cpu_count() or 1
+    return args
+
+
+def main():
+    args = parse_args()
+    tasks = build_tasks(args)
+    graph = TaskGraph(tasks, CACHE_FILE)
+    targets = args.targets or [t.name for t in tasks]
+
+    if args.list:
+        for task in tasks:
+            deps = f" (after {', '.join(task.deps)})" if task.deps else ""
+            print(f"  {task.name:<10} {task.description}{deps}")
+        return 0
+
+    try:
+        if args.dry_run:
+            for name, reasons in graph.plan(targets, force=args.force).items():
+                if not reasons:
+                    print(f"  {name:<10} up to date")
+                elif all(r.startswith("after ") for r in reasons):
+                    print(f"  {name:<10} maybe: {', '.join(reasons)} (if it changes an input)")
+                else:
+                    print(f"  {name:<10} run: {', '.join(reasons[:3])}")
+            return 0
+
+        print(f"🏗️  Building {', '.join(graph.closure(targets))}")
+        start = time.perf_counter()
+        outcomes = graph.run(targets, jobs=args.jobs, force=args.force, report=print_outcome)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    counts = {}
+    for outcome in outcomes.values():
+        counts[outcome["status"]] = counts.get(outcome["status"], 0) + 1
+    summary = ", ".join(f"{n} {status}" for status, n in counts.items())
+    print(f"\n{'🎉' if not counts.get(FAILED) else '❌'} {summary} in {time.perf_counter() - start:.2f}s")
+    return 1 if counts.get(FAILED) or counts.get("blocked") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
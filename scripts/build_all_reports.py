@@ -4,15 +4,26 @@ Build all reports from their config.yml files.
 
 Usage:
     python scripts/build_all_reports.py
+    python scripts/build_all_reports.py --jobs 4    # build 4 reports at a time
+
+Each report's output is printed as one block, followed by a timing table
+per report and per chart.
 """
 
+import argparse
+import contextlib
+import io
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-# Add macros to path
-sys.path.insert(0, str(Path(__file__).parent.parent / "macros"))
+# Add the project root to Python path so we can import macros
+sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from build_report import build_report
+from build_report import LEGACY_MODES, build_report
+from macros.plotlyjs import PLOTLYJS_MODES, plotly_bundle
 
 
 def find_report_configs():
@@ -25,31 +36,120 @@ def find_report_configs():
     return sorted(configs)
 
 
-def build_all_reports():
-    """Build all reports found in docs/reports/*/config.yml"""
+def build_one_report(config_path: str, plotlyjs_mode: str, legacy: str) -> dict:
+    """
+    Build a single report with its output captured.
+    
+    Never raises: failures are returned in "error", so one broken report
+    does not stop the others.
+    """
+    log = io.StringIO()
+    started = time.perf_counter()
+    result, error = None, None
+    with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            result = build_report(config_path, plotlyjs_mode=plotlyjs_mode, legacy=legacy)
+        except Exception as e:
+            error = str(e)
+    return {"config": config_path, "log": log.getvalue(), "result": result,
+            "error": error, "seconds": time.perf_counter() - started}
+
+
+def run_reports(configs: list, plotlyjs_mode: str, legacy: str, jobs: int):
+    """Yield the outcome of each report build, in config order"""
+    if jobs <= 1 or len(configs) <= 1:
+        for config_path in configs:
+            yield build_one_report(str(config_path), plotlyjs_mode, legacy)
+        return
+    
+    with ProcessPoolExecutor(max_workers=min(jobs, len(configs))) as pool:
+        futures = [pool.submit(build_one_report, str(c), plotlyjs_mode, legacy) for c in configs]
+        for config_path, future in zip(configs, futures):
+            try:
+                yield future.result()
+            except Exception as e:  # worker crashed or result failed to unpickle
+                yield {"config": str(config_path), "log": "", "result": None,
+                       "error": str(e), "seconds": 0.0}
+
+
+def print_timings(outcomes: list):
+    """Aggregate timing table, slowest report first"""
+    print("\n⏱️  Timings")
+    print(f"  {'report':<32} {'charts':>6} {'cached':>6} {'built':>6} {'seconds':>8}")
+    for outcome in sorted(outcomes, key=lambda o: -o["seconds"]):
+        result = outcome["result"]
+        name = Path(outcome["config"]).parent.name
+        if result is None:
+            print(f"  {name:<32} {'failed':>20} {outcome['seconds']:>8.2f}")
+            continue
+        charts = result["charts"]
+        print(f"  {name:<32} {len(charts):>6} {result['hits']:>6} {result['misses']:>6} {outcome['seconds']:>8.2f}")
+        for chart in sorted(charts, key=lambda c: -c["seconds"]):
+            label = f"{chart['id']} ({chart['type']})"
+            print(f"    {label:<30} {chart['status']:>20} {chart['seconds']:>8.2f}")
+
+
+def build_all_reports(plotlyjs_mode: str = "cdn", legacy: str = "link", jobs: int = 1):
+    """Build all reports found in docs/reports/*/config.yml; returns {"total", "failed"}"""
     configs = find_report_configs()
     
     if not configs:
         print("📭 No report configs found in docs/reports/")
-        return
+        return {"total": 0, "failed": []}
     
     print(f"🏗️  Found {len(configs)} reports to build")
+    if jobs > 1 and len(configs) > 1:
+        print(f"   Building across {min(jobs, len(configs))} workers")
+    
+    # Install the shared bundle once, before workers race for it
+    if plotlyjs_mode != "cdn":
+        plotly_bundle()
     
+    outcomes = []
+    failed = []
     success_count = 0
-    for config_path in configs:
-        try:
-            print(f"\n📊 Building {config_path.parent.name}")
-            build_report(str(config_path))
-            success_count += 1
-        except Exception as e:
-            print(f"❌ Error building {config_path}: {e}")
+    hits = misses = 0
+    for outcome in run_reports(configs, plotlyjs_mode, legacy, jobs):
+        outcomes.append(outcome)
+        print(f"\n📊 Building {Path(outcome['config']).parent.name}")
+        print(outcome["log"], end="")
+        if outcome["error"] is not None:
+            print(f"❌ Error building {outcome['config']}: {outcome['error']}")
+            failed.append(outcome["config"])
+            continue
+        hits += outcome["result"]["hits"]
+        misses += outcome["result"]["misses"]
+        success_count += 1
     
+    print_timings(outcomes)
     print(f"\n🎉 Built {success_count}/{len(configs)} reports successfully!")
+    print(f"   Charts: {hits} cached, {misses} built")
+    return {"total": len(configs), "failed": failed}
+
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Build all reports from their config.yml files")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1,
+        help="number of reports to build in parallel worker processes (0 = one per CPU)",
+    )
+    parser.add_argument(
+        "--plotlyjs", choices=PLOTLYJS_MODES, default="cdn",
+        help="load plotly.js from the CDN or from a self-hosted, content-hashed bundle",
+    )
+    parser.add_argument(
+        "--legacy", choices=LEGACY_MODES, default="link",
+        help="serve legacy assets/{slug}-{id}/ charts as a hardlink, a redirect stub, or not at all",
+    )
+    return parser.parse_args(argv)
 
 
 def main():
+    args = parse_args()
+    jobs = args.jobs or os.cpu_count() or 1
     try:
-        build_all_reports()
+        build_all_reports(plotlyjs_mode=args.plotlyjs, legacy=args.legacy, jobs=jobs)
     except Exception as e:
         print(f"❌ Error: {e}")
         sys.exit(1)
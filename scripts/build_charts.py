@@ -4,84 +4,110 @@ Chart builder script - builds all charts from specifications.
 
 Usage:
     python scripts/build_charts.py
+    python scripts/build_charts.py --jobs 4    # build cache misses in 4 processes
+    python scripts/build_charts.py --plotlyjs local    # self-hosted plotly.js
+    python scripts/build_charts.py --plotlyjs partial  # smallest bundle per figure
+    python scripts/build_charts.py --format json       # figure JSON + shared loader page
+    python scripts/build_charts.py --typed-arrays --precision 3  # base64 typed arrays
+    python scripts/build_charts.py --watch      # rebuild charts and reports on every change
     
 This script:
 1. Reads chart specifications from YAML files
 2. Builds charts using the registry system
-3. Outputs interactive HTML files
-4. Uses smart caching to skip unchanged charts
+3. Outputs interactive HTML files (or figure JSON with --format json)
+4. Uses content-hash dependency tracking to skip unchanged charts
 """
 
+import argparse
+import contextlib
+import dataclasses
+import gzip
+import importlib
+import inspect
+import io
 import json
-import hashlib
+import os
 import time
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import yaml
-import plotly.io as pio
 
 # Add the project root to Python path so we can import macros
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from macros.charts import build
+from macros.charts import Theme, build, builder_inputs, builder_source_hash, load_theme
+from macros.depcache import BuildCache, fingerprint, hash_obj, hash_text
+from macros.plotlyjs import (
+    PLOTLYJS_MODES, bundle_for, bundle_for_types, bundle_summary, include_plotlyjs,
+    plotly_bundle, plotly_version, resolve_plotlyjs, script_url, trace_types,
+)
 
 # Configuration
 SPEC_PATHS = ["docs/_data/charts.yml"]  # Can be extended to support multiple spec files
 CACHE_DIR = Path(".cache")
 CACHE_FILE = CACHE_DIR / "charts.json"
+DOCS_DIR = Path("docs")
 
-# Ensure cache directory exists
-CACHE_DIR.mkdir(exist_ok=True)
-
-def load_cache() -> dict:
-    """Load the build cache"""
-    if CACHE_FILE.exists():
-        try:
-            return json.loads(CACHE_FILE.read_text())
-        except (json.JSONDecodeError, FileNotFoundError):
-            return {}
-    return {}
-
-def save_cache(cache: dict):
-    """Save the build cache"""
-    CACHE_FILE.write_text(json.dumps(cache, indent=2))
+# --format json: slug -> figure map and the shared page that renders them
+FIGURE_INDEX = DOCS_DIR / "assets" / "figures.json"
+LOADER_PATH = DOCS_DIR / "static" / "figure.html"
+LOADER_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Chart</title>
+<style>
+  html, body {{ margin: 0; padding: 0; background: transparent; }}
+  #figure {{ width: 100%; min-height: 560px; }}
+</style>
+<script charset="utf-8" src="{plotly_src}"></script>
+<script src="js/chart-loader.js"></script>
+</head>
+<body>
+<div id="figure"></div>
+<script>
+  // static/figure.html?slug=<name> or ?src=assets/<slug>/figure.json
+  var q = new URLSearchParams(location.search), el = document.getElementById("figure");
+  if (q.get("src")) el.setAttribute("data-figure-src", q.get("src"));
+  else if (q.get("slug")) el.setAttribute("data-figure-slug", q.get("slug"));
+</script>
+</body>
+</html>
+"""
 
-def fingerprint(spec_item: dict) -> str:
+def chart_deps(item: dict, cache: BuildCache, theme_hash: str, writer_hash: str) -> dict:
     """
-    Generate a fingerprint for a chart specification.
+    Collect the dependency record for a chart specification.
     
     This includes:
     - The spec item itself (chart config)
-    - Data file modification time
-    - Theme file modification time
+    - Content hashes of every file the builder reads
+    - The builder's source (and the helpers it calls)
+    - The resolved theme and the HTML writer
     """
-    # Hash the spec item
-    spec_str = json.dumps(spec_item, sort_keys=True).encode()
-    h = hashlib.sha256(spec_str).hexdigest()
-    
-    # Include data file mtime
-    params = spec_item.get("params", {})
-    data_path_key = "data_path"
-    if data_path_key in params:
-        data_path = Path(params[data_path_key])
-        if data_path.exists():
-            h += str(int(data_path.stat().st_mtime))
-        else:
-            print(f"Warning: Data file not found: {data_path}")
+    params = item.get("params", {})
+    inputs = cache.hasher.digests(builder_inputs(item["type"], params))
+    for path, digest in inputs.items():
+        if digest is None:
+            print(f"Warning: Data file not found: {path}")
     
-    # Include theme file mtime
-    theme_path = Path("docs/_data/site.yml")
-    if theme_path.exists():
-        h += str(int(theme_path.stat().st_mtime))
+    try:
+        builder = builder_source_hash(item["type"])
+    except KeyError:
+        builder = None  # unknown type; build() reports the error
     
-    # Return final hash
-    return hashlib.sha256(h.encode()).hexdigest()
+    return {
+        "spec": hash_obj(item),
+        "builder": builder,
+        "theme": theme_hash,
+        "writer": writer_hash,
+        "inputs": inputs,
+    }
 
-def write_html(fig, output_path: Path):
-    """Write a Plotly figure to HTML file"""
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    # Update layout for natural height and proper margins
+def prepare_layout(fig):
+    """Update layout for natural height and proper margins"""
     fig.update_layout(
         title=None,                        # <- hide inner chart title
         autosize=True,
@@ -91,20 +117,156 @@ def write_html(fig, output_path: Path):
         xaxis=dict(automargin=True),
         yaxis=dict(automargin=True),
     )
+    return fig
+
+def write_html(fig, output_path: Path, plotlyjs="cdn", typed: bool = False, precision: int = None):
+    """
+    Write a Plotly figure to HTML file.
+    
+    plotlyjs is a resolved --plotlyjs source ("cdn", "partial" or a bundle
+    path); returns the script source the figure ended up referencing.
+    With typed, x/y arrays are written as base64 typed arrays (see
+    macros/typedarrays.py), floats rounded to precision decimals.
+    """
+    import plotly.io as pio
+    from macros.typedarrays import HYDRATE_JS, encode_figure
     
-    # Write HTML with CDN-hosted Plotly.js for smaller file sizes
-    pio.write_html(
-        fig, 
-        file=str(output_path), 
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    prepare_layout(fig)
+    
+    # Reference Plotly.js from the CDN or a shared self-hosted bundle
+    source = bundle_for(plotlyjs, fig)
+    html = pio.to_html(
+        encode_figure(fig, precision) if typed else fig,
         full_html=True, 
-        include_plotlyjs="cdn",
+        include_plotlyjs=include_plotlyjs(source, output_path),
         config={"responsive": True, "displaylogo": False},
+        validate=not typed,
         # do NOT set default_height="100%"
     )
+    if typed:
+        # Resolve {"shared": i} x/y references before plotly.js sees the data
+        html = html.replace("Plotly.newPlot(", f"({HYDRATE_JS})(", 1)
+    output_path.write_text(html, encoding="utf-8")
+    return source
+
+def write_json(fig, output_path: Path, compress: bool = False, typed: bool = False, precision: int = None):
+    """Write a Plotly figure as compact JSON (gzipped when compress is set)"""
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    prepare_layout(fig)
+    
+    if typed:
+        import plotly.io as pio
+        from macros.typedarrays import encode_figure
+        
+        data = pio.to_json(encode_figure(fig, precision), validate=False).encode("utf-8")
+    else:
+        data = fig.to_json(validate=False).encode("utf-8")
+    if compress:
+        data = gzip.compress(data, mtime=0)  # mtime=0 keeps the bytes reproducible
+    output_path.write_bytes(data)
 
-def build_all():
-    """Build all charts from specifications"""
-    cache = load_cache()
+def figure_path(item: dict, output: dict) -> Path:
+    """Output file of a chart in the selected --format"""
+    path = Path(item["output"])
+    if output["format"] == "json":
+        path = path.with_suffix(".json.gz" if output["gzip"] else ".json")
+    return path
+
+def write_figure_index(charts: list, output: dict):
+    """Write the slug -> figure JSON map used by the chart loader"""
+    index = {}
+    for item in charts:
+        path = figure_path(item, output)
+        if DOCS_DIR in path.parents and path.exists():
+            index[item.get("name", path.parent.name)] = path.relative_to(DOCS_DIR).as_posix()
+    
+    text = json.dumps(index, indent=2, sort_keys=True)
+    if not FIGURE_INDEX.exists() or FIGURE_INDEX.read_text() != text:
+        FIGURE_INDEX.write_text(text)
+
+def write_loader_page(source):
+    """Write the shared page that renders any figure JSON (?slug= or ?src=)"""
+    text = LOADER_PAGE.format(plotly_src=script_url(source, LOADER_PATH))
+    if not LOADER_PATH.exists() or LOADER_PATH.read_text() != text:
+        LOADER_PATH.write_text(text)
+
+def bundle_changed(record) -> bool:
+    """
+    True when a cached figure would now get a different partial bundle.
+    
+    Happens when a partial bundle was unavailable (offline) on the previous
+    build and the figure fell back to the full bundle.
+    """
+    meta = (record or {}).get("meta")
+    if not meta or "traces" not in meta or "plotlyjs" not in meta:
+        return False
+    return str(bundle_for_types("partial", meta["traces"])) != meta.get("plotlyjs")
+
+def build_one(item: dict, theme: Theme, output: dict):
+    """
+    Build and write a single chart.
+    
+    Runs in the parent for serial builds and in a worker process for
+    ``--jobs N``. Returns ``{"error": ...}`` instead of raising so the
+    caller can report failures per chart, or the output metadata to
+    record in the cache.
+    """
+    try:
+        fig = build(
+            chart_type=item["type"],
+            theme=theme,
+            **item.get("params", {})
+        )
+        meta = {"traces": sorted(trace_types(fig))}
+        if output["format"] == "json":
+            write_json(fig, figure_path(item, output), output["gzip"], output["typed"], output["precision"])
+        else:
+            meta["plotlyjs"] = str(write_html(
+                fig, figure_path(item, output), output["plotlyjs"], output["typed"], output["precision"]
+            ))
+        return {"error": None, "meta": meta}
+    except Exception as e:
+        return {"error": str(e)}
+
+def run_builds(pending: list, theme: Theme, output: dict, jobs: int):
+    """Yield (task, result) for each pending build, in submission order"""
+    if jobs <= 1 or len(pending) <= 1:
+        for task in pending:
+            yield task, build_one(task["item"], theme, output)
+        return
+    
+    with ProcessPoolExecutor(max_workers=min(jobs, len(pending))) as pool:
+        futures = [pool.submit(build_one, task["item"], theme, output) for task in pending]
+        for task, future in zip(pending, futures):
+            try:
+                result = future.result()
+            except Exception as e:  # worker crashed or result failed to unpickle
+                result = {"error": str(e)}
+            yield task, result
+
+def build_all(jobs: int = 1, plotlyjs_mode: str = "cdn", fmt: str = "html", compress: bool = False,
+              typed: bool = False, precision: int = None):
+    """Build all charts from specifications; returns {"total", "built", "cached", "failed"}"""
+    if typed:
+        from macros import typedarrays
+        
+        if not typedarrays.supported():
+            raise ValueError(f"--typed-arrays needs plotly.js >= {'.'.join(map(str, typedarrays.MIN_PLOTLYJS))}; upgrade plotly")
+    cache = BuildCache(CACHE_FILE)
+    theme = load_theme()
+    theme_hash = hash_obj(dataclasses.asdict(theme))
+    plotlyjs = resolve_plotlyjs(plotlyjs_mode)
+    output = {"format": fmt, "plotlyjs": plotlyjs, "gzip": compress, "typed": typed, "precision": precision}
+    writer = write_json if fmt == "json" else write_html
+    writer_hash = hash_text(
+        inspect.getsource(prepare_layout) + inspect.getsource(writer)
+        + (inspect.getsource(typedarrays) if typed else "")
+        + plotly_version() + hash_obj(output)
+    )
+    all_charts = []
+    pending = []
+    failed = []
     changed = 0
     total = 0
     
@@ -123,55 +285,284 @@ def build_all():
             continue
         
         charts = spec.get("charts", [])
+        all_charts += charts
         total += len(charts)
         
         for item in charts:
             name = item.get("name", "unnamed")
-            output_path = Path(item["output"])
+            output_path = figure_path(item, output)
             
-            # Generate fingerprint
-            fp = fingerprint(item)
+            # Generate fingerprint from the dependency record
+            deps = chart_deps(item, cache, theme_hash, writer_hash)
+            fp = fingerprint(deps)
             
             # Check if we need to rebuild
             cache_key = output_path.as_posix()
-            if cache.get(cache_key) == fp and output_path.exists():
+            stale_bundle = plotlyjs == "partial" and bundle_changed(cache.lookup(cache_key))
+            if cache.is_fresh(cache_key, fp, output_path) and not stale_bundle:
+                cache.keep(cache_key)
                 print(f"  ✓ {name} (cached)")
                 continue
             
-            try:
-                # Build the chart
-                print(f"  Building {name}...")
-                fig = build(
-                    chart_type=item["type"],
-                    **item.get("params", {})
-                )
-                
-                # Write HTML output
-                write_html(fig, output_path)
-                
-                # Update cache
-                cache[cache_key] = fp
-                changed += 1
-                print(f"  ✓ {name} → {output_path}")
-                
-            except Exception as e:
-                print(f"  ✗ Error building {name}: {e}")
-                continue
+            reasons = ", ".join(cache.changed(cache_key, deps)) or ("plotly.js bundle" if stale_bundle else "output missing")
+            pending.append({"item": item, "name": name, "key": cache_key, "path": output_path,
+                            "fp": fp, "deps": deps, "reasons": reasons})
+    
+    # Install the fallback bundle once, before workers race for it
+    if plotlyjs == "partial" and pending:
+        plotly_bundle()
+    
+    if jobs > 1 and len(pending) > 1:
+        print(f"  Building {len(pending)} charts across {min(jobs, len(pending))} workers...")
+    
+    # Results come back in spec order, so output and cache stay deterministic
+    for task, result in run_builds(pending, theme, output, jobs):
+        name = task["name"]
+        if jobs <= 1:
+            print(f"  Building {name} ({task['reasons']})...")
+        if result["error"] is not None:
+            print(f"  ✗ Error building {name}: {result['error']}")
+            failed.append((name, result["error"]))
+            continue
+        
+        # Update cache
+        cache.record(task["key"], task["fp"], task["deps"], meta=result["meta"])
+        changed += 1
+        print(f"  ✓ {name} → {task['path']}")
     
     # Save cache
-    save_cache(cache)
+    cache.save()
+    
+    # JSON figures share one loader page, loading a bundle that covers every figure
+    sources = [rec.get("meta", {}).get("plotlyjs") for rec in cache.outputs.values()]
+    if fmt == "json":
+        traces = set()
+        for rec in cache.outputs.values():
+            traces.update(rec.get("meta", {}).get("traces", []))
+        loader_source = bundle_for_types(plotlyjs, traces)
+        write_figure_index(all_charts, output)
+        write_loader_page(loader_source)
+        sources = [str(loader_source)]
     
     print(f"\nSummary:")
     print(f"  Total charts: {total}")
     print(f"  Built/updated: {changed}")
-    print(f"  Cached (skipped): {total - changed}")
+    print(f"  Cached (skipped): {total - changed - len(failed)}")
+    if failed:
+        print(f"  Failed: {len(failed)}")
+    
+    # Bundle sizes of every output in the cache, built now or earlier
+    if plotlyjs != "cdn":
+        for line in bundle_summary(s for s in sources if s and Path(s).exists()):
+            print(f"  {line}")
+    
+    return {"total": total, "built": changed, "cached": total - changed - len(failed), "failed": failed}
+
+# --watch: builder modules reloaded when their source changes, dependencies first
+RELOADABLE = ("macros.downsample", "macros.charts")
+WATCH_INTERVAL = 0.3
+
+def report_configs():
+    """Report config.yml files"""
+    return sorted(Path("docs/reports").glob("*/config.yml"))
+
+def watch_targets() -> dict:
+    """
+    Files to poll, grouped by what they affect.
+    
+    {"code": [...], "charts": [...], "reports": {config: [...]}}, where a
+    change to any "code" file (builder modules, site.yml) affects everything.
+    """
+    from build_report import chart_params
+    
+    code = [Path(sys.modules[name].__file__) for name in RELOADABLE]
+    code.append(sys.modules["macros.charts"].SITE_PATH)
+    
+    charts = [Path(p) for p in SPEC_PATHS]
+    for spec_path in SPEC_PATHS:
+        try:
+            spec = yaml.safe_load(Path(spec_path).read_text()) or {}
+        except (OSError, yaml.YAMLError):
+            continue
+        for item in spec.get("charts", []):
+            charts += [Path(p) for p in builder_inputs(item.get("type"), item.get("params", {}))]
+    
+    reports = {}
+    for config in report_configs():
+        files = [config]
+        try:
+            conf = yaml.safe_load(config.read_text()) or {}
+            report = conf["report"]
+            files.append(Path("docs") / report["data"])
+            for spec in conf.get("charts", []):
+                files += [Path(p) for p in builder_inputs(spec["type"], chart_params(spec, report))]
+        except (OSError, yaml.YAMLError, KeyError, TypeError):
+            pass  # build_report reports the broken config
+        reports[config] = files
+    
+    return {"code": code, "charts": charts, "reports": reports}
+
+def watched_paths(targets: dict) -> set:
+    """Every file in targets, plus report configs that may have appeared"""
+    paths = set(targets["code"]) | set(targets["charts"]) | set(report_configs())
+    for files in targets["reports"].values():
+        paths.update(files)
+    return paths
+
+def stamps(paths) -> dict:
+    """(mtime_ns, size) per path; None for missing files"""
+    result = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+            result[Path(path).as_posix()] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            result[Path(path).as_posix()] = None
+    return result
+
+def reload_builders():
+    """Re-import the builder modules and rebind the names this script and build_report use"""
+    import build_report
+    
+    for name in RELOADABLE:
+        importlib.reload(sys.modules[name])
+    charts = sys.modules["macros.charts"]
+    for namespace in (globals(), vars(build_report)):
+        for name in ("Theme", "build", "builder_inputs", "builder_source_hash", "load_theme"):
+            if name in namespace:
+                namespace[name] = getattr(charts, name)
+
+def quietly(fn, *args, **kwargs):
+    """Call fn with its progress output captured; returns (result, error)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            return fn(*args, **kwargs), None
+        except Exception as e:
+            return None, str(e)
+
+def rebuild(charts: bool, reports: list, options: dict):
+    """Rebuild the affected outputs and print one line per target"""
+    from build_report import build_report
+    
+    if charts:
+        result, error = quietly(build_all, **options)
+        if error:
+            print(f"  ✗ charts: {error}")
+        else:
+            print(f"  charts: {result['built']} built, {result['cached']} cached")
+            for name, message in result["failed"]:
+                print(f"    ✗ {name}: {message}")
+    for config in reports:
+        result, error = quietly(build_report, str(config), plotlyjs_mode=options["plotlyjs_mode"])
+        if error:
+            print(f"  ✗ report {config.parent.name}: {error}")
+        else:
+            print(f"  report {result['slug']}: {result['misses']} built, {result['hits']} cached")
+
+def watch(interval: float = WATCH_INTERVAL, **options):
+    """
+    Keep one process warm and rebuild what a change affects.
+    
+    Polls chart specs, report configs, their data files, site.yml and the
+    builder modules. Imports, the chart registry and the dataset cache stay
+    loaded between rebuilds; edited builder modules are reloaded in place.
+    Charts build in this process: fresh workers per rebuild would start
+    cold and would not see the reloaded builders.
+    """
+    if options.get("jobs", 1) > 1:
+        print("ℹ️  --watch builds in this process; --jobs is ignored")
+    options = dict(options, jobs=1)
+    targets = watch_targets()
+    started = time.perf_counter()
+    rebuild(True, list(targets["reports"]), options)
+    print(f"⏱️  Initial build in {(time.perf_counter() - started) * 1000:.0f} ms")
+    seen = stamps(watched_paths(targets))
+    print(f"👀 Watching {len(seen)} files (Ctrl+C to stop)")
+    
+    while True:
+        try:
+            time.sleep(interval)
+        except KeyboardInterrupt:
+            print("\n👋 Stopped watching")
+            return
+        current = stamps(watched_paths(targets) | {Path(p) for p in seen})
+        changed = {p for p, stamp in current.items() if stamp != seen.get(p)}
+        if not changed:
+            continue
+        
+        started = time.perf_counter()
+        print(f"🔄 {', '.join(sorted(changed))}")
+        code = {p.as_posix() for p in targets["code"]}
+        if any(p in code and p.endswith(".py") for p in changed):
+            try:
+                reload_builders()
+            except Exception as e:  # keep the previous builders until the module imports again
+                print(f"  ✗ reload failed: {e}")
+                seen = current
+                continue
+        
+        targets = watch_targets()
+        everything = bool(changed & code)
+        charts = everything or bool(changed & {p.as_posix() for p in targets["charts"]})
+        reports = [config for config, files in targets["reports"].items()
+                   if everything or changed & {p.as_posix() for p in files}]
+        rebuild(charts, reports, options)
+        print(f"⏱️  Rebuilt in {(time.perf_counter() - started) * 1000:.0f} ms")
+        seen = stamps(watched_paths(targets))
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Build all charts from specifications")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1,
+        help="number of worker processes for cache-miss charts (0 = one per CPU)",
+    )
+    parser.add_argument(
+        "--plotlyjs", choices=PLOTLYJS_MODES, default="cdn",
+        help="load plotly.js from the CDN or from a self-hosted, content-hashed bundle",
+    )
+    parser.add_argument(
+        "--format", choices=("html", "json"), default="html",
+        help="standalone HTML per chart, or figure JSON rendered by static/figure.html",
+    )
+    parser.add_argument(
+        "--gzip", action="store_true",
+        help="with --format json, write gzipped figure.json.gz files",
+    )
+    parser.add_argument(
+        "--typed-arrays", action="store_true",
+        help="encode x/y as base64 typed arrays, dates as numbers, shared x arrays once",
+    )
+    parser.add_argument(
+        "--precision", type=int, default=None,
+        help="with --typed-arrays, round floats to this many decimals",
+    )
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="stay running and rebuild affected charts and reports whenever inputs change",
+    )
+    parser.add_argument(
+        "--interval", type=float, default=WATCH_INTERVAL,
+        help="with --watch, seconds between polls",
+    )
+    args = parser.parse_args(argv)
+    if args.precision is not None and not args.typed_arrays:
+        parser.error("--precision requires --typed-arrays")
+    return args
 
 def main():
     """Main entry point"""
+    args = parse_args()
+    jobs = args.jobs or os.cpu_count() or 1
     start_time = time.time()
     
+    options = dict(jobs=jobs, plotlyjs_mode=args.plotlyjs, fmt=args.format, compress=args.gzip,
+                   typed=args.typed_arrays, precision=args.precision)
     try:
-        build_all()
+        if args.watch:
+            watch(interval=args.interval, **options)
+        else:
+            build_all(**options)
     except KeyboardInterrupt:
         print("\nBuild interrupted by user")
         return 1
@@ -4,25 +4,51 @@ Per-report chart builder using config.yml approach.
 
 Usage:
     python scripts/build_report.py docs/reports/vergunningen-2025/config.yml
+    python scripts/build_report.py docs/reports/vergunningen-2025/config.yml --plotlyjs local
+    python scripts/build_report.py docs/reports/vergunningen-2025/config.yml --legacy off
+
+Unchanged charts are skipped using a per-report cache in .cache/reports/<slug>.json.
 """
 
+import argparse
+import dataclasses
+import inspect
 import yaml
-import json
-import hashlib
 from pathlib import Path
-import pandas as pd
-import plotly.io as pio
+import shutil
 import sys
 import os
+import time
+
+# Add the project root to Python path so we can import macros
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from macros.charts import build, builder_inputs, builder_source_hash, load_theme
+from macros.depcache import BuildCache, fingerprint, hash_obj, hash_text
+from macros.plotlyjs import (
+    PLOTLYJS_MODES, bundle_for, bundle_for_types, include_plotlyjs, plotly_version, resolve_plotlyjs,
+    trace_types,
+)
 
-# Add macros to path
-sys.path.insert(0, str(Path(__file__).parent.parent / "macros"))
-from charts import build, load_site_config
+# Per-report dependency caches: .cache/reports/<slug>.json
+REPORT_CACHE_DIR = Path(".cache") / "reports"
 
+# How the legacy assets/{slug}-{id}/ location is served (see write_legacy)
+LEGACY_MODES = ("link", "stub", "off")
+LEGACY_STUB = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Redirecting…</title>
+<link rel="canonical" href="{url}">
+<meta http-equiv="refresh" content="0; url={url}">
+<script>location.replace("{url}" + location.search + location.hash);</script>
+</head>
+<body><a href="{url}">This chart has moved.</a></body>
+</html>
+"""
 
-def load_site():
-    """Load site configuration"""
-    return load_site_config()
+# Report chart keys that describe the asset or layout rather than builder params
+REPORT_ONLY_KEYS = {"id", "type", "data", "summary", "tags", "xaxis", "yaxis", "legend"}
 
 
 def abs_out(path):
@@ -32,107 +58,265 @@ def abs_out(path):
     return p
 
 
-def fingerprint(obj):
-    """Create a content fingerprint for cache busting"""
-    return hashlib.sha256(json.dumps(obj, sort_keys=True).encode()).hexdigest()[:8]
+def chart_params(spec: dict, report: dict) -> dict:
+    """Translate a report chart spec into keyword params for its builder"""
+    params = {k: v for k, v in spec.items() if k not in REPORT_ONLY_KEYS}
+    params["data_path"] = str(Path("docs") / spec.get("data", report["data"]))
+    
+    # defaults.title: null means never draw a title inside the figure
+    defaults = report.get("defaults", {})
+    if "title" in defaults and defaults["title"] is None:
+        params["title"] = ""
+    return params
+
+
+def apply_layout_overrides(fig, spec: dict, defaults: dict):
+    """Apply report defaults and per-chart axis/legend settings"""
+    for key in ("xaxis", "yaxis", "legend"):
+        merged = {**defaults.get(key, {}), **spec.get(key, {})}
+        if merged:
+            fig.update_layout({key: merged})
+    return fig
+
+
+def write_legacy(target: Path, legacy_path: Path, mode: str) -> str:
+    """
+    Serve the legacy chart location without serializing the figure again.
+    
+    "link" hardlinks the clean HTML (falling back to a symlink, then a
+    copy); "stub" writes a small redirect page. Figures that load a
+    self-hosted plotly.js use relative script paths, so they always get a
+    stub. Returns how the file was written.
+    """
+    if legacy_path.is_symlink() or legacy_path.exists():
+        legacy_path.unlink()
+    
+    if mode == "link":
+        try:
+            os.link(target, legacy_path)
+            return "hardlink"
+        except OSError:
+            pass
+        try:
+            legacy_path.symlink_to(os.path.relpath(target, legacy_path.parent))
+            return "symlink"
+        except OSError:
+            shutil.copyfile(target, legacy_path)
+            return "copy"
+    
+    url = Path(os.path.relpath(target, legacy_path.parent)).as_posix()
+    legacy_path.write_text(LEGACY_STUB.format(url=url), encoding="utf-8")
+    return "redirect"
+
+
+def remove_legacy(legacy_dir: Path, chart_id: str) -> bool:
+    """
+    Delete what write_legacy and build_report left in a legacy folder.
+    
+    Used with ``--legacy off``, so the old URL stops serving a stale
+    chart. The folder goes too once it is empty. Returns True if anything
+    was removed.
+    """
+    removed = False
+    for path in (legacy_dir / f"{chart_id}.html", legacy_dir / "asset.yml"):
+        if path.is_symlink() or path.exists():
+            path.unlink()
+            removed = True
+    if legacy_dir.is_dir() and not any(legacy_dir.iterdir()):
+        legacy_dir.rmdir()
+    return removed
 
 
-def build_report(config_path: str):
-    """Build all charts for a report from its config.yml"""
+def bundle_changed(record) -> bool:
+    """True when a cached chart fell back to a bundle it would no longer get"""
+    meta = (record or {}).get("meta")
+    if not meta or "traces" not in meta or "plotlyjs" not in meta:
+        return False
+    return str(bundle_for_types("partial", meta["traces"])) != meta["plotlyjs"]
+
+
+def report_deps(spec: dict, report: dict, cache: BuildCache, theme_hash: str, writer_hash: str) -> dict:
+    """
+    Collect the dependency record for one report chart.
+    
+    This includes:
+    - The chart spec and the report section (slug, data, defaults)
+    - Content hashes of every file the builder reads
+    - The builder's source (and the helpers it calls)
+    - The resolved theme and the writer settings
+    """
+    inputs = cache.hasher.digests(builder_inputs(spec["type"], chart_params(spec, report)))
+    try:
+        builder = builder_source_hash(spec["type"])
+    except KeyError:
+        builder = None  # unknown type; build() reports the error
+    
+    return {
+        "spec": hash_obj(spec),
+        "report": hash_obj(report),
+        "builder": builder,
+        "theme": theme_hash,
+        "writer": writer_hash,
+        "inputs": inputs,
+    }
+
+
+def build_report(config_path: str, plotlyjs_mode: str = "cdn", legacy: str = "link"):
+    """
+    Build all charts for a report from its config.yml.
+    
+    Charts whose dependency record is unchanged, and whose outputs all
+    exist, are skipped. Returns {"slug", "hits", "misses", "seconds",
+    "charts"}, with one {"id", "type", "status", "seconds"} per chart.
+    """
     config_path = Path(config_path)
     if not config_path.exists():
         raise FileNotFoundError(f"Config file not found: {config_path}")
     
+    started = time.perf_counter()
     print(f"📊 Building report from {config_path}")
     
     # Load configuration
     conf = yaml.safe_load(config_path.read_text())
-    site = load_site()
+    report = conf["report"]
+    report_slug = report["slug"]
     
-    # Load data
-    data_path = Path("docs") / conf["report"]["data"]
+    data_path = Path("docs") / report["data"]
     if not data_path.exists():
         raise FileNotFoundError(f"Data file not found: {data_path}")
     
-    df = pd.read_csv(data_path)
-    defaults = conf["report"].get("defaults", {})
+    # One cache file per report, so reports never share (or race on) a file
+    cache = BuildCache(REPORT_CACHE_DIR / f"{report_slug}.json")
+    defaults = report.get("defaults", {})
+    theme = load_theme()
+    theme_hash = hash_obj(dataclasses.asdict(theme))
+    plotlyjs = resolve_plotlyjs(plotlyjs_mode)
+    writer_hash = hash_text(
+        inspect.getsource(chart_params) + inspect.getsource(apply_layout_overrides)
+        + inspect.getsource(write_legacy) + plotly_version()
+        + hash_obj({"plotlyjs": plotlyjs, "legacy": legacy})
+    )
     
     print(f"📈 Found {len(conf['charts'])} charts to build")
     
-    # Build each chart
-    for spec in conf["charts"]:
-        chart_id = spec["id"]
-        print(f"  Building {chart_id} ({spec['type']})")
-        
-        # Build the chart
-        fig = build(spec["type"], df=df, site=site, spec=spec, defaults=defaults)
-        
-        # Clean structure: assets/reports/{slug}/charts/{chart-id}/
-        report_slug = conf["report"]["slug"]
-        chart_asset_dir = abs_out(f'assets/reports/{report_slug}/charts/{chart_id}')
-        chart_asset_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Save HTML in clean structure
-        asset_html_path = chart_asset_dir / f'{chart_id}.html'
-        pio.write_html(
-            fig, 
-            file=str(asset_html_path), 
-            full_html=True, 
-            include_plotlyjs="cdn",
-            config={"responsive": True, "displaylogo": False}
-        )
-        
-        # Also maintain legacy compatibility path for existing macros
-        asset_slug = f'{conf["report"]["slug"]}-{chart_id}'
-        legacy_path = abs_out(f'assets/{asset_slug}/{chart_id}.html')
-        pio.write_html(
-            fig, 
-            file=str(legacy_path), 
-            full_html=True, 
-            include_plotlyjs="cdn",
-            config={"responsive": True, "displaylogo": False}
-        )
-        
-        # Create asset.yml for this chart in the clean structure
-        asset = {
-            "slug": f'{conf["report"]["slug"]}-{chart_id}',
-            "title": spec.get("title", chart_id.replace("-", " ").title()),
-            "summary": spec.get("summary", f"Interactieve grafiek – {chart_id}"),
-            "tags": spec.get("tags", ["vergunningen", "Vlaanderen", "2025"]),
-            "type": "interactive",
-            "files": {
-                "html": str(asset_html_path).replace("docs/", ""),
-                "csv": conf["report"]["data"]
+    hits = 0
+    timings = []
+    try:
+        # Build each chart
+        for spec in conf["charts"]:
+            chart_id = spec["id"]
+            chart_started = time.perf_counter()
+            asset_slug = f'{report_slug}-{chart_id}'
+            
+            # Clean structure: assets/reports/{slug}/charts/{chart-id}/
+            chart_asset_dir = Path("docs") / f'assets/reports/{report_slug}/charts/{chart_id}'
+            asset_html_path = chart_asset_dir / f'{chart_id}.html'
+            asset_path = chart_asset_dir / "asset.yml"
+            outputs = [asset_path]
+            legacy_dir = Path("docs") / f'assets/{asset_slug}'
+            if legacy != "off":
+                outputs += [legacy_dir / f'{chart_id}.html', legacy_dir / "asset.yml"]
+            elif remove_legacy(legacy_dir, chart_id):
+                print(f"  🧹 {chart_id}: removed legacy {legacy_dir}")
+            
+            deps = report_deps(spec, report, cache, theme_hash, writer_hash)
+            fp = fingerprint(deps)
+            cache_key = asset_html_path.as_posix()
+            stale_bundle = plotlyjs == "partial" and bundle_changed(cache.lookup(cache_key))
+            if (cache.is_fresh(cache_key, fp, asset_html_path) and not stale_bundle
+                    and all(p.exists() or p.is_symlink() for p in outputs)):
+                cache.keep(cache_key)
+                hits += 1
+                print(f"  ✓ {chart_id} (cached)")
+                timings.append({"id": chart_id, "type": spec["type"], "status": "cached",
+                                "seconds": time.perf_counter() - chart_started})
+                continue
+            
+            reasons = ", ".join(cache.changed(cache_key, deps)) or ("plotly.js bundle" if stale_bundle else "output missing")
+            print(f"  Building {chart_id} ({spec['type']}; {reasons})")
+            
+            # Build the chart
+            fig = build(spec["type"], theme=theme, **chart_params(spec, report))
+            apply_layout_overrides(fig, spec, defaults)
+            chart_asset_dir.mkdir(parents=True, exist_ok=True)
+            
+            # Save HTML in clean structure (the only serialization of the figure)
+            import plotly.io as pio
+            
+            source = bundle_for(plotlyjs, fig)
+            pio.write_html(
+                fig, 
+                file=str(asset_html_path), 
+                full_html=True, 
+                include_plotlyjs=include_plotlyjs(source, asset_html_path),
+                config={"responsive": True, "displaylogo": False}
+            )
+            
+            # Create asset.yml for this chart in the clean structure
+            asset = {
+                "slug": asset_slug,
+                "title": spec.get("title", chart_id.replace("-", " ").title()),
+                "summary": spec.get("summary", f"Interactieve grafiek – {chart_id}"),
+                "tags": spec.get("tags", ["vergunningen", "Vlaanderen", "2025"]),
+                "type": "interactive",
+                "files": {
+                    "html": str(asset_html_path).replace("docs/", ""),
+                    "csv": report["data"]
+                }
             }
-        }
-        
-        # Save asset.yml in clean structure
-        asset_path = chart_asset_dir / "asset.yml"
-        asset_path.write_text(yaml.safe_dump(asset), encoding="utf-8")
-        
-        # Also save legacy asset.yml for compatibility
-        legacy_asset_dir = abs_out(f'assets/{asset_slug}')
-        legacy_asset_dir.mkdir(parents=True, exist_ok=True)
-        legacy_asset_path = legacy_asset_dir / "asset.yml"
-        legacy_asset = asset.copy()
-        legacy_asset["files"]["html"] = str(legacy_path).replace("docs/", "")
-        legacy_asset_path.write_text(yaml.safe_dump(legacy_asset), encoding="utf-8")
-        
-        print(f"    ✅ {asset_html_path}")
-        print(f"    ✅ {legacy_path} (legacy)")
-        print(f"    ✅ {asset_path}")
-    
-    print(f"🎉 Report '{conf['report']['slug']}' built successfully!")
+            asset_yml = yaml.safe_dump(asset)
+            
+            # Save asset.yml in clean structure
+            asset_path.write_text(asset_yml, encoding="utf-8")
+            print(f"    ✅ {asset_html_path}")
+            
+            # Legacy compatibility path assets/{slug}-{id}/ for existing embeds
+            if legacy != "off":
+                legacy_path = abs_out(f'assets/{asset_slug}/{chart_id}.html')
+                how = write_legacy(asset_html_path, legacy_path, legacy if source == "cdn" else "stub")
+                
+                # Same asset.yml, pointing at the clean HTML
+                legacy_asset_path = legacy_path.parent / "asset.yml"
+                legacy_asset_path.write_text(asset_yml, encoding="utf-8")
+                print(f"    ✅ {legacy_path} (legacy {how})")
+            
+            print(f"    ✅ {asset_path}")
+            cache.record(cache_key, fp, deps, meta={"plotlyjs": str(source), "traces": sorted(trace_types(fig))})
+            timings.append({"id": chart_id, "type": spec["type"], "status": "built",
+                            "seconds": time.perf_counter() - chart_started})
+    finally:
+        # Keep whatever was built, even if a later chart failed
+        cache.save()
+    
+    misses = len(conf["charts"]) - hits
+    print(f"🎉 Report '{report_slug}' built successfully! ({hits} cached, {misses} built)")
+    return {"slug": report_slug, "hits": hits, "misses": misses,
+            "seconds": time.perf_counter() - started, "charts": timings}
+
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Build all charts for a report from its config.yml",
+        epilog="Example: python scripts/build_report.py docs/reports/vergunningen-2025/config.yml",
+    )
+    parser.add_argument("config", help="path to the report config.yml")
+    parser.add_argument(
+        "--plotlyjs", choices=PLOTLYJS_MODES, default="cdn",
+        help="load plotly.js from the CDN or from a self-hosted, content-hashed bundle",
+    )
+    parser.add_argument(
+        "--legacy", choices=LEGACY_MODES, default="link",
+        help="serve legacy assets/{slug}-{id}/ charts as a hardlink, a redirect stub, or not at all (off removes earlier copies)",
+    )
+    return parser.parse_args(argv)
 
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python scripts/build_report.py <config.yml>")
-        print("Example: python scripts/build_report.py docs/reports/vergunningen-2025/config.yml")
-        sys.exit(1)
+    args = parse_args()
     
     try:
-        build_report(sys.argv[1])
+        build_report(args.config, plotlyjs_mode=args.plotlyjs, legacy=args.legacy)
     except Exception as e:
         print(f"❌ Error building report: {e}")
         sys.exit(1)
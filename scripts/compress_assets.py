@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Write pre-compressed .gz (and .br) siblings for generated static files.
+
+Usage:
+    python scripts/compress_assets.py                        # the MkDocs output in site/
+    python scripts/compress_assets.py site docs/assets       # several roots
+    python scripts/compress_assets.py --brotli --jobs 0      # also .br, one worker per CPU
+    python scripts/compress_assets.py --min-size 4096
+
+Every HTML, CSV, JSON, JS, CSS and SVG file of at least --min-size bytes
+gets a sibling (figure.html -> figure.html.gz) that hosts can serve as-is.
+Siblings are only kept when they are smaller than the original.
+
+Runs are incremental: files are tracked by content hash in
+.cache/compress.json, and compressed bytes are kept in .cache/compressed/
+by hash. A file whose content did not change is skipped, or its sibling is
+restored from that store when the output directory was rebuilt
+(`mkdocs build --clean`). Only new or changed content is recompressed.
+"""
+
+import argparse
+import gzip
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Add the project root to Python path so we can import macros
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from macros.depcache import BuildCache, fingerprint, hash_obj
+
+CACHE_FILE = Path(".cache") / "compress.json"
+STORE_DIR = Path(".cache") / "compressed"
+DEFAULT_ROOTS = ("site",)
+EXTENSIONS = (".html", ".csv", ".json", ".js", ".css", ".svg")
+MIN_SIZE = 1024
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+ENCODINGS = ("gz", "br")
+
+
+def have_brotli() -> bool:
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def find_files(roots, min_size: int):
+    """Compressible files under roots, with their size"""
+    files = []
+    for root in roots:
+        for dirpath, _, names in os.walk(root):
+            for name in sorted(names):
+                if name.endswith(EXTENSIONS):
+                    path = Path(dirpath) / name
+                    size = path.stat().st_size
+                    if size >= min_size:
+                        files.append((path, size))
+    return sorted(files)
+
+
+def _write(path: Path, data: bytes):
+    """Write bytes atomically"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def compress_file(path: str, digest: str, encodings: tuple) -> dict:
+    """
+    Write the compressed siblings of one file, reusing stored blobs.
+
+    Returns {encoding: compressed size or None} plus "reused", the number
+    of siblings restored from STORE_DIR instead of recompressed. None means
+    the encoding did not make the file smaller, so no sibling is written.
+    """
+    data = None
+    result = {"reused": 0}
+    remove_siblings(path, [e for e in ENCODINGS if e not in encodings])
+    for encoding in encodings:
+        sibling = Path(f"{path}.{encoding}")
+        blob = STORE_DIR / f"{digest}.{encoding}"
+        if not blob.exists():
+            if data is None:
+                data = Path(path).read_bytes()
+            if encoding == "gz":
+                packed = gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)  # mtime=0 keeps the bytes reproducible
+            else:
+                import brotli
+
+                packed = brotli.compress(data, quality=BROTLI_QUALITY)
+            _write(blob, packed if len(packed) < len(data) else b"")
+        else:
+            result["reused"] += 1
+
+        size = blob.stat().st_size
+        if size:
+            shutil.copyfile(blob, sibling)
+            result[encoding] = size
+        else:  # an empty blob records "compression does not help"
+            sibling.unlink(missing_ok=True)
+            result[encoding] = None
+    return result
+
+
+def run_jobs(pending: list, encodings: tuple, jobs: int):
+    """Yield (task, result) for each file to compress, in order"""
+    if jobs <= 1 or len(pending) <= 1:
+        for task in pending:
+            yield task, compress_file(task["path"], task["digest"], encodings)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(pending))) as pool:
+        futures = [pool.submit(compress_file, t["path"], t["digest"], encodings) for t in pending]
+        for task, future in zip(pending, futures):
+            try:
+                yield task, future.result()
+            except Exception as e:
+                yield task, {"error": str(e)}
+
+
+def siblings_match(path: str, meta: dict, encodings: tuple) -> bool:
+    """True when exactly the siblings recorded in meta exist"""
+    return all(Path(f"{path}.{e}").exists() == bool(meta.get(e)) for e in encodings)
+
+
+def remove_siblings(path: str, encodings=ENCODINGS):
+    """Delete the compressed siblings of a file"""
+    for encoding in encodings:
+        Path(f"{path}.{encoding}").unlink(missing_ok=True)
+
+
+def prune_store(cache: BuildCache):
+    """Drop stored blobs no tracked file refers to anymore"""
+    live = {rec["deps"]["source"] for rec in cache.outputs.values()}
+    if STORE_DIR.exists():
+        for blob in STORE_DIR.iterdir():
+            if blob.name.split(".", 1)[0] not in live:
+                blob.unlink()
+
+
+def _count(totals: dict, size: int, meta: dict, encodings: tuple):
+    """Add one file to the byte totals; files without a sibling count at full size"""
+    totals["files"] += 1
+    totals["original"] += size
+    for e in encodings:
+        totals[e] += meta.get(e) or size
+
+
+def compress_assets(roots, min_size: int = MIN_SIZE, use_brotli: bool = False, jobs: int = 1) -> dict:
+    """Compress every eligible file under roots; returns the byte totals"""
+    encodings = ENCODINGS if use_brotli else ("gz",)
+    settings = hash_obj({"gzip": GZIP_LEVEL, "brotli": BROTLI_QUALITY if use_brotli else None})
+    roots = [Path(root) for root in roots]
+    cache = BuildCache(CACHE_FILE)
+    pending, unchanged = [], 0
+    totals = {"files": 0, "original": 0, **{e: 0 for e in encodings}}
+
+    files = find_files(roots, min_size)
+    tracked = {path.as_posix() for path, _ in files}
+    for path, size in files:
+        key = path.as_posix()
+        deps = {"source": cache.hasher.digest(path), "settings": settings}
+        fp = fingerprint(deps)
+        record = cache.lookup(key)
+        if record and record.get("fingerprint") == fp and siblings_match(key, record["meta"], encodings):
+            cache.keep(key)
+            unchanged += 1
+            _count(totals, size, record["meta"], encodings)
+            continue
+        pending.append({"path": key, "size": size, "digest": deps["source"], "fp": fp, "deps": deps})
+
+    # Files under these roots that dropped out (deleted, or now below
+    # --min-size) lose their siblings; records of other roots are kept
+    for key in cache.recorded():
+        if not any(Path(key).is_relative_to(root) for root in roots):
+            cache.keep(key)
+        elif key not in tracked:
+            remove_siblings(key)
+
+    compressed = reused = 0
+    for task, result in run_jobs(pending, encodings, jobs):
+        if "error" in result:
+            print(f"  ✗ {task['path']}: {result['error']}")
+            continue
+        meta = {"size": task["size"], **{e: result[e] for e in encodings}}
+        cache.record(task["path"], task["fp"], task["deps"], meta=meta)
+        _count(totals, task["size"], meta, encodings)
+        reused += result["reused"] == len(encodings)
+        compressed += result["reused"] < len(encodings)
+
+    cache.save()
+    prune_store(cache)
+    totals.update(compressed=compressed, reused=reused, unchanged=unchanged)
+    return totals
+
+
+def print_report(totals: dict, encodings: tuple, seconds: float):
+    """Files handled and bytes saved per encoding"""
+    print(f"  Files: {totals['files']} ({totals['compressed']} compressed, "
+          f"{totals['reused']} restored from cache, {totals['unchanged']} unchanged)")
+    original = totals["original"]
+    for e in encodings:
+        saved = original - totals[e]
+        share = saved / original if original else 0
+        print(f"  .{e}: {original / 1e6:.2f} MB → {totals[e] / 1e6:.2f} MB, saved {saved / 1e6:.2f} MB ({share:.0%})")
+    print(f"Done in {seconds:.2f}s")
+
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Write pre-compressed .gz/.br siblings for static files")
+    parser.add_argument("roots", nargs="*", default=list(DEFAULT_ROOTS), help="directories to compress (default: site)")
+    parser.add_argument("--min-size", type=int, default=MIN_SIZE, help="skip files smaller than this many bytes")
+    parser.add_argument("--brotli", action="store_true", help="also write .br siblings (requires the brotli package)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="worker processes (0 = one per CPU)")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    roots = [r for r in args.roots if Path(r).is_dir()]
+    if not roots:
+        print(f"📭 Nothing to compress: {', '.join(args.roots)} not found (run mkdocs build first?)")
+        return 0
+    if args.brotli and not have_brotli():
+        print("⚠️  brotli is not installed (pip install brotli); writing .gz only")
+        args.brotli = False
+
+    encodings = ENCODINGS if args.brotli else ("gz",)
+    print(f"🗜️  Compressing {', '.join(roots)}...")
+    start = time.perf_counter()
+    totals = compress_assets(roots, min_size=args.min_size, use_brotli=args.brotli,
+                             jobs=args.jobs or os.cpu_count() or 1)
+    print_report(totals, encodings, time.perf_counter() - start)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
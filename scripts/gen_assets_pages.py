@@ -7,15 +7,22 @@ DOCS = "docs"
 # Only look for assets in direct subdirectories of assets/ (skip embed folders)
 ASSET_YMLS = [yml for yml in glob.glob(os.path.join(DOCS, "assets", "*/asset.yml"), recursive=False) 
               if not os.path.basename(os.path.dirname(yml)).endswith("-embed")]
+# Report charts (build_report.py) also live under assets/reports/<report>/charts/<id>/;
+# their legacy assets/<report>-<id>/ copy carries the same slug and may be switched off
+ASSET_YMLS += sorted(glob.glob(os.path.join(DOCS, "assets", "reports", "*", "charts", "*", "asset.yml")))
 
 def write(path, content):
     with mkdocs_gen_files.open(path, "w") as f:
         f.write(content)
 
+seen = set()
 for yml in ASSET_YMLS:
     with open(yml, "r", encoding="utf-8") as fh:
         meta = yaml.safe_load(fh) or {}
     slug = meta.get("slug")
+    if slug in seen:
+        continue
+    seen.add(slug)
     title = meta.get("title", slug)
     summary = meta.get("summary", "")
     tags = meta.get("tags", [])
@@ -1,31 +1,44 @@
 #!/usr/bin/env python3
-import json, pandas as pd
-from pathlib import Path
+"""
+Convert the raw bouwbedrijven JSON exports to the report CSVs.
 
-RAW_DIR  = Path("docs/assets/reports/bouwbedrijven-2025/_data/raw")
-OUT_DIR  = Path("docs/assets/reports/bouwbedrijven-2025/data")
-OUT_DIR.mkdir(parents=True, exist_ok=True)
+Usage:
+    python scripts/json_to_csv_bouwbedrijven.py
+    python scripts/json_to_csv_bouwbedrijven.py --stream   # flat memory for large exports
+    python scripts/json_to_csv_bouwbedrijven.py --incremental   # only process new periods
 
-def load_json(path):
-    with open(path, encoding="utf-8") as f:
-        data = json.load(f)
-    return data["facts"] if isinstance(data, dict) and "facts" in data else data
+Writes monthly_clean.csv, yearly_clean.csv and yoy_growth.csv. Every step
+is column-wise: Dutch month names are parsed once per distinct value, and
+filters use vectorized string/isin masks. With --stream the facts array
+is parsed incrementally and filtered while parsing, so only the kept rows
+and columns are ever held in memory.
+
+--incremental keeps a watermark (last Maand / Jaar) per export in
+.cache/etl/bouwbedrijven.json and appends only newer periods to the CSVs,
+recomputing YoY growth from the last 12 rows already written. If any fact
+up to the watermark changed, or an output was edited, it rebuilds fully.
+
+Each CSV also gets a typed Parquet sidecar in .cache/columnar/ when pyarrow
+is installed (see macros/columnar.py); the CSVs stay the published files.
+"""
+import argparse, hashlib, io, json, os, sys, pandas as pd
+from pathlib import Path
 
-def to_datetime_nl(maand_str):
-    mapping = {'Januari':'January','Februari':'February','Maart':'March','April':'April','Mei':'May','Juni':'June',
-               'Juli':'July','Augustus':'August','September':'September','Oktober':'October','November':'November','December':'December'}
-    s = maand_str
-    for nl,en in mapping.items(): s = s.replace(nl, en)
-    return pd.to_datetime(s, format="%B %Y")
+# Add the project root to Python path so we can import macros
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from macros.columnar import read_sidecar, write_csv, write_sidecar
+from macros.depcache import hash_file, hash_obj
+from macros.jsonstream import iter_json_array
+from macros.pipeline import MONTHS_NL, parse_nl_months
 
-maand = pd.DataFrame(load_json(RAW_DIR / "maandcijfers.json"))
-jaar  = pd.DataFrame(load_json(RAW_DIR / "jaarcijfers.json"))
+RAW_DIR  = Path("docs/assets/reports/bouwbedrijven-2025/_data/raw")
+OUT_DIR  = Path("docs/assets/reports/bouwbedrijven-2025/data")
+STATE_PATH = Path(".cache/etl/bouwbedrijven.json")
 
-if "Sectie" in maand: maand = maand[maand["Sectie"].astype(str).str.startswith("F")]
-if "Sectie" in jaar:  jaar  = jaar.dropna(subset=["Sectie"])
-if "Sectie" in jaar:  jaar  = jaar[jaar["Sectie"].astype(str).str.startswith("F")]
+# Regions outside Belgium's three Gewesten
+EXCLUDED_GEWESTEN = ["Buitenland", "Onbekend"]
 
-def keep_gewest(v): return v not in ["Buitenland", "Onbekend"]
+VALUE_COLUMNS = ["Starters","Stoppers","Totaal_ondernemingen"]
 
 rename_m = {
     "Gewest":"Gewest","Maand":"Maand",
@@ -40,23 +53,232 @@ rename_y = {
     "Aantal btw-plichtige":"Totaal_ondernemingen",
 }
 
-maand = maand.rename(columns=rename_m)
-jaar  = jaar.rename(columns=rename_y)
+def load_json(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return data["facts"] if isinstance(data, dict) and "facts" in data else data
+
+def keep_fact(fact: dict) -> bool:
+    """Row-level equivalent of filter_facts, applied while streaming"""
+    if "Sectie" in fact and not str(fact["Sectie"]).startswith("F"):
+        return False
+    return fact.get("Gewest") not in EXCLUDED_GEWESTEN
+
+def maand_period(fact: dict) -> str:
+    """Sortable period of a monthly fact: 'Januari 2021' -> '2021-01'"""
+    name, _, year = str(fact["Maand"]).strip().rpartition(" ")
+    return f"{int(year):04d}-{MONTHS_NL[name.strip().capitalize()]:02d}"
+
+def jaar_period(fact: dict) -> str:
+    return f"{int(fact['Jaar']):04d}"
+
+def scan_facts(path, rename: dict, period=None, watermark=None):
+    """
+    Stream the kept facts of a raw export, split at a watermark.
+
+    Returns (history, digest, frame, latest): the digest of kept facts up to
+    the watermark, the digest of all kept facts, a frame of the newer facts
+    (every fact without a watermark) with only the renamed columns, and the
+    latest period seen. Labels are categoricals and counts float64, the
+    dtypes the full-load path ends up with for the value columns.
+    """
+    history, digest = hashlib.sha256(), hashlib.sha256()
+    columns = {new: [] for new in rename.values()}
+    latest = watermark
+    for fact in iter_json_array(path, key="facts"):
+        if not keep_fact(fact):
+            continue
+        row = [fact.get(old) for old in rename]
+        line = json.dumps(row).encode() + b"\n"
+        digest.update(line)
+        key = period(fact) if period else None
+        if watermark is not None and key <= watermark:
+            history.update(line)
+            continue
+        for new, value in zip(rename.values(), row):
+            columns[new].append(value)
+        if key is not None and (latest is None or key > latest):
+            latest = key
+    frame = pd.DataFrame({
+        new: pd.Series(values, dtype="float64" if new in VALUE_COLUMNS else "category")
+        for new, values in columns.items()
+    })
+    return history.hexdigest(), digest.hexdigest(), frame, latest
+
+def stream_facts(path, rename: dict) -> pd.DataFrame:
+    """Kept facts of a raw export with only the renamed columns"""
+    return scan_facts(path, rename)[2]
+
+def filter_facts(df: pd.DataFrame) -> pd.DataFrame:
+    """Keep construction (Sectie F) facts for the three Gewesten"""
+    if "Sectie" in df:
+        df = df[df["Sectie"].astype(str).str.startswith("F")]
+    return df[~df["Gewest"].isin(EXCLUDED_GEWESTEN)]
+
+def monthly_totals(maand: pd.DataFrame) -> pd.DataFrame:
+    """Monthly totals per Datum of filtered, renamed facts"""
+    maand = maand.assign(Datum=parse_nl_months(maand["Maand"]))
+    return maand.groupby("Datum", as_index=False)[VALUE_COLUMNS].sum()
+
+def yearly_totals(jaar: pd.DataFrame) -> pd.DataFrame:
+    """Yearly totals per Jaar of filtered, renamed facts"""
+    jaar = jaar.assign(Jaar=pd.to_numeric(jaar["Jaar"].astype(object), errors="coerce").astype("Int64"))
+    return jaar.groupby("Jaar", as_index=False)[VALUE_COLUMNS].sum()
+
+def monthly(facts) -> pd.DataFrame:
+    """Monthly totals per Datum"""
+    return monthly_totals(filter_facts(pd.DataFrame(facts)).rename(columns=rename_m))
+
+def yearly(facts) -> pd.DataFrame:
+    """Yearly totals per Jaar"""
+    return yearly_totals(filter_facts(pd.DataFrame(facts)).rename(columns=rename_y))
+
+def yoy_growth(mv: pd.DataFrame) -> pd.DataFrame:
+    """Year-over-year growth of the number of companies"""
+    mv = mv.sort_values("Datum")
+    return mv.assign(YoY_pct=mv["Totaal_ondernemingen"].pct_change(periods=12) * 100)[["Datum","Totaal_ondernemingen","YoY_pct"]]
+
+def write_outputs(mv: pd.DataFrame, yv: pd.DataFrame, out_dir: Path = OUT_DIR):
+    out_dir.mkdir(parents=True, exist_ok=True)
+    write_csv(mv, out_dir/"monthly_clean.csv")
+    write_csv(yv, out_dir/"yearly_clean.csv")
+    write_csv(yoy_growth(mv), out_dir/"yoy_growth.csv")
+
+def tail_csv(path: Path, n: int, **kwargs) -> pd.DataFrame:
+    """Last n rows of a CSV, reading only the end of the file"""
+    with open(path, "rb") as f:
+        header = f.readline()
+        start = f.tell()
+        pos = f.seek(0, os.SEEK_END)
+        data = b""
+        while pos > start and data.count(b"\n") <= n:
+            step = min(1 << 14, pos - start)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    lines = data.splitlines()[-n:] if n else []
+    return pd.read_csv(io.BytesIO(header + b"".join(line + b"\n" for line in lines)), **kwargs)
+
+def append_csv(df: pd.DataFrame, path: Path, previous=None):
+    """Append rows; the sidecar is extended too if it matched the CSV's previous digest"""
+    old = read_sidecar(path, previous) if previous else None
+    df.to_csv(path, mode="a", header=False, index=False)
+    if old is not None:
+        write_sidecar(pd.concat([old, df], ignore_index=True), path, hash_file(path))
+
+# Incremental state: one watermark and history digest per raw export
+EXPORTS = {
+    "monthly": ("maandcijfers.json", rename_m, maand_period, ["monthly_clean.csv", "yoy_growth.csv"]),
+    "yearly": ("jaarcijfers.json", rename_y, jaar_period, ["yearly_clean.csv"]),
+}
+
+def load_state() -> dict:
+    """Previous incremental state, or {} when missing, unreadable or built with other settings"""
+    try:
+        state = json.loads(STATE_PATH.read_text())
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return state if state.get("settings") == etl_settings() else {}
+
+def etl_settings() -> str:
+    """Hash of everything besides the facts that shapes the outputs"""
+    return hash_obj([rename_m, rename_y, EXCLUDED_GEWESTEN, VALUE_COLUMNS, str(OUT_DIR)])
+
+def outputs_intact(record: dict, names: list) -> bool:
+    """True when the CSVs are exactly what the previous run wrote"""
+    return all(
+        (OUT_DIR / name).exists() and hash_file(OUT_DIR / name) == record.get("outputs", {}).get(name)
+        for name in names
+    )
+
+def write_export(name: str, frame: pd.DataFrame, previous=None):
+    """
+    Write the outputs of one export, or append to them when previous (the
+    {csv: digest} map of the last run) is given
+    """
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    if name == "yearly":
+        yv = yearly_totals(frame)
+        if previous:
+            append_csv(yv, OUT_DIR/"yearly_clean.csv", previous.get("yearly_clean.csv"))
+        else:
+            write_csv(yv, OUT_DIR/"yearly_clean.csv")
+        return len(yv)
+
+    mv = monthly_totals(frame)
+    if previous:
+        # YoY of the new months needs the 12 months before them
+        monthly_csv = OUT_DIR/"monthly_clean.csv"
+        tail = read_sidecar(monthly_csv, previous.get("monthly_clean.csv"))
+        tail = tail.tail(12) if tail is not None else tail_csv(monthly_csv, 12, parse_dates=["Datum"])
+        yoy = yoy_growth(pd.concat([tail, mv], ignore_index=True)).iloc[len(tail):]
+        append_csv(mv, monthly_csv, previous.get("monthly_clean.csv"))
+        append_csv(yoy, OUT_DIR/"yoy_growth.csv", previous.get("yoy_growth.csv"))
+    else:
+        write_csv(mv, OUT_DIR/"monthly_clean.csv")
+        write_csv(yoy_growth(mv), OUT_DIR/"yoy_growth.csv")
+    return len(mv)
+
+def run_incremental():
+    """Process only periods after each export's watermark"""
+    state = load_state()
+    new_state = {"settings": etl_settings()}
+    for name, (raw, rename, period, outputs) in EXPORTS.items():
+        record = state.get(name, {})
+        watermark = record.get("watermark") if outputs_intact(record, outputs) else None
+        history, digest, frame, latest = scan_facts(RAW_DIR / raw, rename, period, watermark)
+        if watermark is not None and history != record.get("digest"):
+            print(f"🔁 {raw}: facts up to {watermark} changed, rebuilding")
+            watermark = None
+            history, digest, frame, latest = scan_facts(RAW_DIR / raw, rename, period)
 
-maand = maand[maand["Gewest"].apply(keep_gewest)].copy()
-jaar  = jaar[jaar["Gewest"].apply(keep_gewest)].copy()
+        if watermark is None:
+            rows = write_export(name, frame)
+            print(f"📄 {raw}: full rebuild ({rows} rows, up to {latest})")
+        elif frame.empty:
+            print(f"✓ {raw}: up to date ({watermark})")
+        else:
+            rows = write_export(name, frame, previous=record["outputs"])
+            print(f"➕ {raw}: appended {rows} rows ({watermark} → {latest})")
 
-maand["Datum"] = maand["Maand"].apply(to_datetime_nl)
-jaar["Jaar"] = pd.to_numeric(jaar["Jaar"], errors="coerce").astype("Int64")
+        new_state[name] = {
+            "watermark": latest,
+            "digest": digest,
+            "outputs": {out: hash_file(OUT_DIR / out) for out in outputs},
+        }
 
-mv = maand.groupby("Datum", as_index=False)[["Starters","Stoppers","Totaal_ondernemingen"]].sum()
-yv = jaar.groupby("Jaar", as_index=False)[["Starters","Stoppers","Totaal_ondernemingen"]].sum()
+    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps(new_state, indent=2))
+    os.replace(tmp, STATE_PATH)
 
-mv.to_csv(OUT_DIR/"monthly_clean.csv", index=False)
-yv.to_csv(OUT_DIR/"yearly_clean.csv", index=False)
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Convert the raw bouwbedrijven JSON exports to CSV")
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="parse the facts arrays incrementally, filtering while parsing",
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="append only periods newer than the last run (implies --stream)",
+    )
+    return parser.parse_args(argv)
 
-mv = mv.sort_values("Datum")
-mv["YoY_pct"] = mv["Totaal_ondernemingen"].pct_change(periods=12) * 100
-mv[["Datum","Totaal_ondernemingen","YoY_pct"]].to_csv(OUT_DIR/"yoy_growth.csv", index=False)
+def main():
+    args = parse_args()
+    if args.incremental:
+        run_incremental()
+        print("✅ CSV's bijgewerkt in:", OUT_DIR)
+        return
+    if args.stream:
+        mv = monthly_totals(stream_facts(RAW_DIR / "maandcijfers.json", rename_m))
+        yv = yearly_totals(stream_facts(RAW_DIR / "jaarcijfers.json", rename_y))
+    else:
+        mv = monthly(load_json(RAW_DIR / "maandcijfers.json"))
+        yv = yearly(load_json(RAW_DIR / "jaarcijfers.json"))
+    write_outputs(mv, yv)
+    print("✅ CSV's geschreven naar:", OUT_DIR)
 
-print("✅ CSV's geschreven naar:", OUT_DIR)
+if __name__ == "__main__":
+    main()
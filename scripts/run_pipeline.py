@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Run the declarative ETL pipelines of report configs.
+
+Usage:
+    python scripts/run_pipeline.py                     # every docs/reports/*/config.yml with a pipeline
+    python scripts/run_pipeline.py docs/reports/bouwbedrijven-2025/config.yml
+    python scripts/run_pipeline.py --force             # ignore the cache
+
+A `pipeline:` section lists named pipelines, each with a source (json, csv
+or another pipeline), stages (filter, rename, parse_dates, cast, aggregate,
+derive) and an optional CSV sink. See macros/pipeline.py.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import yaml
+
+# Add the project root to Python path so we can import macros
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from macros.pipeline import run_pipelines
+
+
+def find_pipeline_configs():
+    """Report configs that declare a pipeline"""
+    configs = sorted(Path("docs/reports").glob("*/config.yml"))
+    return [c for c in configs if "pipeline" in (yaml.safe_load(c.read_text()) or {})]
+
+
+def run_config(config_path: Path, force: bool = False) -> bool:
+    """Run the pipelines of one report config"""
+    conf = yaml.safe_load(config_path.read_text())
+    if "pipeline" not in conf:
+        print(f"⚠️  No pipeline section in {config_path}")
+        return True
+
+    slug = conf.get("report", {}).get("slug", config_path.parent.name)
+    print(f"🔧 {slug}")
+    try:
+        results = run_pipelines(conf["pipeline"], slug, force=force)
+    except Exception as e:
+        print(f"❌ Pipeline failed: {e}")
+        return False
+
+    for result in results:
+        rows = "" if result["rows"] is None else f"{result['rows']} rows"
+        print(f"  {'✓' if result['status'] == 'cached' else '✅'} {result['name']:<20} {result['status']:<8} {rows:>10} {result['seconds']:6.2f}s")
+    return True
+
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Run the ETL pipelines declared in report configs")
+    parser.add_argument("configs", nargs="*", help="report config.yml files (default: all with a pipeline)")
+    parser.add_argument("--force", action="store_true", help="rebuild every pipeline, ignoring the cache")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    configs = [Path(c) for c in args.configs] or find_pipeline_configs()
+    if not configs:
+        print("📭 No report configs with a pipeline section found")
+        return
+
+    ok = all([run_config(c, force=args.force) for c in configs])
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,19 +8,47 @@ Run this before `mkdocs build` to catch issues early.
 Usage:
     python scripts/validate_assets.py
     uv run python scripts/validate_assets.py
+    python scripts/validate_assets.py --json    # machine-readable report for CI
+
+docs/assets is walked once into an in-memory index of files; archive, raw
+data (`_*`, `raw`) and generated `*-embed` folders are not descended into.
+New or changed asset.yml files are parsed in parallel. Schema results are
+cached by asset.yml content hash in .cache/validate_assets.json, so a warm
+run only re-checks file references against the index.
 """
 
+import argparse
+import inspect
+import json
+import os
 import yaml
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+# Add the project root to Python path so we can import macros
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from macros.depcache import BuildCache, fingerprint, hash_text
+
+# Anchored at the project root, like docs_root in main(), so any working directory shares it
+CACHE_FILE = Path(__file__).resolve().parent.parent / ".cache" / "validate_assets.json"
+
+# Directories under docs/assets that never hold asset.yml files
+SKIP_DIRS = ("raw",)
+SKIP_SUFFIXES = ("-embed",)
+
+# Below this many files to parse, worker start-up costs more than it saves
+PARALLEL_MIN = 64
+
+Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
 
 def load_asset_yml(asset_path: Path) -> Dict[str, Any]:
     """Load and parse an asset.yml file."""
     try:
         with open(asset_path, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f) or {}
+            return yaml.load(f, Loader=Loader) or {}
     except Exception as e:
         raise ValueError(f"Failed to parse {asset_path}: {e}")
 
@@ -61,91 +89,179 @@ def validate_asset_schema(asset_data: Dict[str, Any], asset_path: Path) -> List[
     return errors
 
 
-def validate_file_existence(asset_data: Dict[str, Any], docs_root: Path) -> List[str]:
-    """Validate that referenced files actually exist."""
+def validate_file_existence(asset_data: Dict[str, Any], docs_root: Path,
+                            index: Optional[Set[str]] = None) -> List[str]:
+    """
+    Validate that referenced files actually exist.
+    
+    With an index (docs-relative paths from index_docs), lookups are set
+    membership; paths outside the indexed folders fall back to exists().
+    """
     errors = []
     
     files = asset_data.get('files', {})
+    if not isinstance(files, dict):
+        return errors
     for file_type, file_path in files.items():
         if isinstance(file_path, str):
             # Convert site-rooted path to filesystem path
-            if file_path.startswith('assets/'):
-                fs_path = docs_root / file_path
+            if not file_path.startswith('assets/'):
+                file_path_in_docs = f"assets/{file_path}"
             else:
-                fs_path = docs_root / 'assets' / file_path
+                file_path_in_docs = file_path
+            fs_path = docs_root / file_path_in_docs
             
+            if index is not None and file_path_in_docs in index:
+                continue
             if not fs_path.exists():
                 errors.append(f"Referenced file does not exist: {file_path} (looked for: {fs_path})")
     
     return errors
 
 
+def skip_dir(name: str) -> bool:
+    """Folders the index does not descend into"""
+    return name.startswith(('_', '.')) or name in SKIP_DIRS or name.endswith(SKIP_SUFFIXES)
+
+
+def index_docs(docs_root: Path) -> Tuple[List[Path], Set[str]]:
+    """
+    Walk docs/assets once.
+    
+    Returns the asset.yml files and the set of every indexed file, as paths
+    relative to docs_root ("assets/<slug>/<file>").
+    """
+    assets_dir = docs_root / 'assets'
+    asset_files, index = [], set()
+    for dirpath, dirnames, filenames in os.walk(assets_dir):
+        dirnames[:] = sorted(d for d in dirnames if not skip_dir(d))
+        rel = Path(dirpath).relative_to(docs_root).as_posix()
+        for name in filenames:
+            index.add(f"{rel}/{name}")
+            if name == 'asset.yml':
+                asset_files.append(Path(dirpath) / name)
+    return sorted(asset_files), index
+
+
 def find_asset_files(docs_root: Path) -> List[Path]:
     """Find all asset.yml files in the assets directory and subdirectories."""
-    assets_dir = docs_root / 'assets'
-    if not assets_dir.exists():
-        return []
+    return index_docs(docs_root)[0]
+
+
+def parse_asset(asset_path: str) -> dict:
+    """Parse and schema-check one asset.yml; runs in worker processes"""
+    try:
+        asset_data = load_asset_yml(Path(asset_path))
+        files = asset_data.get('files', {})
+        return {
+            "slug": asset_data.get('slug'),
+            "files": {str(k): v for k, v in files.items() if isinstance(v, str)} if isinstance(files, dict) else {},
+            "errors": validate_asset_schema(asset_data, Path(asset_path)),
+        }
+    except Exception as e:
+        return {"slug": None, "files": {}, "errors": [], "failed": str(e)}
+
+
+def parse_assets(paths: List[str], jobs: int) -> List[dict]:
+    """parse_asset for each path, in order, across processes when worthwhile"""
+    if jobs <= 1 or len(paths) < PARALLEL_MIN:
+        return [parse_asset(p) for p in paths]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(parse_asset, paths, chunksize=max(1, len(paths) // (jobs * 4))))
+
+
+def validate_assets(docs_root: Path, jobs: int = 1, use_cache: bool = True) -> List[dict]:
+    """
+    Validate every asset.yml under docs/assets.
+    
+    Returns one {"path", "slug", "errors", "failed", "cached"} per asset
+    ("failed" holds the exception of a file that could not be processed). Parsing and
+    schema checks are cached per content hash; file references are always
+    checked against a fresh index.
+    """
+    asset_files, index = index_docs(docs_root)
+    cache = BuildCache(CACHE_FILE)
+    validator = hash_text(inspect.getsource(load_asset_yml) + inspect.getsource(parse_asset)
+                          + inspect.getsource(validate_asset_schema))
     
-    asset_files = []
+    results, pending = {}, []
+    for asset_path in asset_files:
+        key = asset_path.as_posix()
+        deps = {"source": cache.hasher.digest(asset_path), "validator": validator}
+        fp = fingerprint(deps)
+        record = cache.lookup(key)
+        if use_cache and record and record.get("fingerprint") == fp and "meta" in record:
+            cache.keep(key)
+            results[key] = dict(record["meta"], cached=True)
+        else:
+            pending.append((key, fp, deps))
     
-    # Search recursively for asset.yml files
-    for asset_yml in assets_dir.rglob('asset.yml'):
-        asset_files.append(asset_yml)
+    for (key, fp, deps), parsed in zip(pending, parse_assets([k for k, _, _ in pending], jobs)):
+        cache.record(key, fp, deps, meta=parsed)
+        results[key] = dict(parsed, cached=False)
+    cache.save()
     
-    return asset_files
+    report = []
+    for asset_path in asset_files:
+        result = results[asset_path.as_posix()]
+        errors = result["errors"] + validate_file_existence(result, docs_root, index)
+        report.append({"path": asset_path.as_posix(), "slug": result["slug"], "errors": errors,
+                       "failed": result.get("failed"), "cached": result["cached"]})
+    return report
+
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Validate asset.yml files under docs/assets")
+    parser.add_argument("--json", action="store_true", help="print a JSON report instead of the summary (for CI)")
+    parser.add_argument("-j", "--jobs", type=int, default=0, help="worker processes for parsing (0 = one per CPU)")
+    parser.add_argument("--no-cache", action="store_true", help="re-parse every asset.yml, ignoring cached results")
+    return parser.parse_args(argv)
 
 
 def main():
     """Main validation function."""
+    args = parse_args()
     # Find project root and docs directory
     script_dir = Path(__file__).parent
     project_root = script_dir.parent
     docs_root = project_root / 'docs'
     
     if not docs_root.exists():
-        print(f"❌ Docs directory not found: {docs_root}")
+        if args.json:
+            print(json.dumps({"ok": False, "error": f"Docs directory not found: {docs_root}"}))
+        else:
+            print(f"❌ Docs directory not found: {docs_root}")
         sys.exit(1)
     
-    # Find all asset.yml files
-    asset_files = find_asset_files(docs_root)
+    report = validate_assets(docs_root, jobs=args.jobs or os.cpu_count() or 1, use_cache=not args.no_cache)
+    total_errors = sum(len(r["errors"]) + bool(r["failed"]) for r in report)
+    
+    if args.json:
+        for r in report:
+            r["path"] = Path(r["path"]).relative_to(project_root).as_posix()
+        print(json.dumps({"ok": total_errors == 0, "assets": len(report), "errors": total_errors,
+                          "results": report}, indent=2, ensure_ascii=False))
+        sys.exit(1 if total_errors else 0)
     
-    if not asset_files:
+    if not report:
         print("✅ No asset.yml files found - validation passed")
         return
     
-    print(f"🔍 Validating {len(asset_files)} asset file(s)...")
+    print(f"🔍 Validating {len(report)} asset file(s)...")
     
-    total_errors = 0
-    
-    for asset_path in asset_files:
-        relative_path = asset_path.relative_to(project_root)
+    for r in report:
+        relative_path = Path(r["path"]).relative_to(project_root)
         print(f"\n📄 Checking {relative_path}")
         
-        try:
-            # Load asset data
-            asset_data = load_asset_yml(asset_path)
-            
-            # Validate schema
-            schema_errors = validate_asset_schema(asset_data, asset_path)
-            
-            # Validate file existence
-            file_errors = validate_file_existence(asset_data, docs_root)
-            
-            # Report errors
-            all_errors = schema_errors + file_errors
-            
-            if all_errors:
-                print(f"   ❌ {len(all_errors)} error(s):")
-                for error in all_errors:
-                    print(f"      • {error}")
-                total_errors += len(all_errors)
-            else:
-                slug = asset_data.get('slug', 'unknown')
-                print(f"   ✅ Valid (slug: {slug})")
-        
-        except Exception as e:
-            print(f"   ❌ Failed to process: {e}")
-            total_errors += 1
+        if r["failed"]:
+            print(f"   ❌ Failed to process: {r['failed']}")
+        elif r["errors"]:
+            print(f"   ❌ {len(r['errors'])} error(s):")
+            for error in r["errors"]:
+                print(f"      • {error}")
+        else:
+            print(f"   ✅ Valid (slug: {r['slug'] or 'unknown'})")
     
     # Final summary
     print(f"\n{'='*50}")
@@ -3,18 +3,101 @@
 Validation script for report configurations.
 
 Usage:
+    python scripts/validate_report.py                                  # every docs/reports/*/config.yml
     python scripts/validate_report.py docs/reports/vergunningen-2025/config.yml
+    python scripts/validate_report.py --infer-dtypes 1000              # also check sampled column types
+
+Column checks only read each CSV's header row. Headers (and sampled dtypes)
+are cached by the data file's content hash in .cache/validate_report.json
+and shared between charts and configs that use the same CSV.
 """
 
+import argparse
 import yaml
-import pandas as pd
 from pathlib import Path
 import sys
 import re
 
+# Add the project root to Python path so we can import macros
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from macros.datasets import read_header, sample_dtypes
+from macros.depcache import BuildCache, fingerprint
+
+CACHE_FILE = Path(".cache") / "validate_report.json"
+CONFIG_GLOB = "reports/*/config.yml"
+
+# Field holding the plotted columns, per chart type (builder signatures in macros/charts.py)
+SERIES_FIELDS = {"line_pair": "series", "line_multi": "ys", "bar_grouped": "y",
+                 "scatter_trend": "y", "area_filled": "y"}
+
+
+class DataSchemas:
+    """
+    Column names, and optionally sampled dtypes, per data file.
+    
+    Each file is read once per run and again only when its content changes.
+    """
+    
+    def __init__(self, infer_rows: int = 0):
+        self.infer_rows = infer_rows
+        self.cache = BuildCache(CACHE_FILE)
+        self._seen = {}
+    
+    def get(self, path: Path) -> dict:
+        """{"columns": [...], "dtypes": {...} when inferring}"""
+        key = path.as_posix()
+        if key in self._seen:
+            return self._seen[key]
+        
+        deps = {"source": self.cache.hasher.digest(path), "infer_rows": self.infer_rows}
+        fp = fingerprint(deps)
+        record = self.cache.lookup(key)
+        if record and record.get("fingerprint") == fp and "meta" in record:
+            self.cache.keep(key)
+            schema = record["meta"]
+        else:
+            schema = {"columns": read_header(path)}
+            if self.infer_rows:
+                schema["dtypes"] = sample_dtypes(path, self.infer_rows)
+            self.cache.record(key, fp, deps, meta=schema)
+        self._seen[key] = schema
+        return schema
+    
+    def save(self):
+        """Persist the cache, keeping records of data files this run did not touch"""
+        for key in self.cache.recorded():
+            if key not in self._seen and Path(key).exists():
+                self.cache.keep(key)
+        self.cache.save()
+
 
-def validate_report_config(config_path: str) -> bool:
+def check_columns(chart_id: str, chart: dict, schema: dict) -> tuple:
+    """Errors for chart columns missing from the data, warnings for non-numeric series"""
+    errors, warnings = [], []
+    columns = set(schema["columns"])
+    dtypes = schema.get("dtypes", {})
+    
+    # Check X column
+    if "x" in chart and chart["x"] not in columns:
+        errors.append(f"Chart '{chart_id}': X column '{chart['x']}' not found in data")
+    
+    # Check series columns
+    extra = chart.get("ys", [])
+    ys = [series.get("column") for series in chart.get("series", [])] + ([extra] if isinstance(extra, str) else list(extra))
+    if isinstance(chart.get("y"), str):
+        ys.append(chart["y"])
+    for col in ys:
+        if col and col not in columns:
+            errors.append(f"Chart '{chart_id}': Series column '{col}' not found in data")
+        elif col in dtypes and not re.match(r"^(u?int|float|Int|UInt|Float)", dtypes[col]):
+            warnings.append(f"Chart '{chart_id}': Series column '{col}' is not numeric (sampled dtype: {dtypes[col]})")
+    return errors, warnings
+
+
+def validate_report_config(config_path: str, schemas: DataSchemas = None) -> bool:
     """Validate a report configuration file"""
+    if schemas is None:
+        schemas = DataSchemas()
     config_path = Path(config_path)
     if not config_path.exists():
         print(f"❌ Config file not found: {config_path}")
@@ -42,32 +125,32 @@ def validate_report_config(config_path: str) -> bool:
         if field not in report:
             errors.append(f"Missing required field: report.{field}")
     
-    # Check data file exists and has required columns
+    # Check data files exist and have the required columns (charts may
+    # override the report's data file)
     if "data" in report:
-        data_path = Path("docs") / report["data"]
-        if not data_path.exists():
-            errors.append(f"Data file not found: {data_path}")
-        else:
+        unreadable = set()
+        for chart in [None] + conf.get("charts", []):
+            data = report["data"] if chart is None else chart.get("data", report["data"])
+            data_path = Path("docs") / data
+            if data_path in unreadable:
+                continue
+            if not data_path.exists():
+                errors.append(f"Data file not found: {data_path}")
+                unreadable.add(data_path)
+                continue
             try:
-                df = pd.read_csv(data_path)
-                print(f"📊 Data file has {len(df)} rows, {len(df.columns)} columns")
-                
-                # Check each chart has required columns
-                for chart in conf.get("charts", []):
-                    chart_id = chart.get("id", "unknown")
-                    
-                    # Check X column
-                    if "x" in chart and chart["x"] not in df.columns:
-                        errors.append(f"Chart '{chart_id}': X column '{chart['x']}' not found in data")
-                    
-                    # Check series columns
-                    for series in chart.get("series", []):
-                        col = series.get("column")
-                        if col and col not in df.columns:
-                            errors.append(f"Chart '{chart_id}': Series column '{col}' not found in data")
-                            
+                schema = schemas.get(data_path)
             except Exception as e:
                 errors.append(f"Error reading data file: {e}")
+                unreadable.add(data_path)
+                continue
+            
+            if chart is None:
+                print(f"📊 Data file has {len(schema['columns'])} columns")
+            else:
+                chart_errors, chart_warnings = check_columns(chart.get("id", "unknown"), chart, schema)
+                errors += chart_errors
+                warnings += chart_warnings
     
     # Check output directory is under assets/reports/
     if "output_dir" in report:
@@ -91,7 +174,7 @@ def validate_report_config(config_path: str) -> bool:
             chart_ids.add(chart_id)
             
             # Check required chart fields
-            required_chart_fields = ["id", "type", "x", "series"]
+            required_chart_fields = ["id", "type", "x", SERIES_FIELDS.get(chart.get("type"), "series")]
             for field in required_chart_fields:
                 if field not in chart:
                     errors.append(f"Chart '{chart_id}': Missing required field '{field}'")
@@ -138,18 +221,37 @@ def validate_report_config(config_path: str) -> bool:
     return len(errors) == 0
 
 
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Validate report configurations")
+    parser.add_argument("configs", nargs="*", help=f"config files (default: every docs/{CONFIG_GLOB})")
+    parser.add_argument("--infer-dtypes", type=int, nargs="?", const=1000, default=0, metavar="ROWS",
+                        help="also infer column dtypes from the first ROWS rows (default 1000) and warn on non-numeric series")
+    return parser.parse_args(argv)
+
+
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python scripts/validate_report.py <config.yml>")
-        print("Example: python scripts/validate_report.py docs/reports/vergunningen-2025/config.yml")
-        sys.exit(1)
+    args = parse_args()
+    configs = args.configs or [str(p) for p in sorted(Path("docs").glob(CONFIG_GLOB))]
+    if not configs:
+        print(f"📭 No report configs found (docs/{CONFIG_GLOB})")
+        sys.exit(0)
     
-    try:
-        is_valid = validate_report_config(sys.argv[1])
-        sys.exit(0 if is_valid else 1)
-    except Exception as e:
-        print(f"❌ Error validating report: {e}")
-        sys.exit(1)
+    schemas = DataSchemas(infer_rows=args.infer_dtypes)
+    failed = 0
+    for i, config_path in enumerate(configs):
+        if i:
+            print()
+        try:
+            failed += not validate_report_config(config_path, schemas)
+        except Exception as e:
+            print(f"❌ Error validating report: {e}")
+            failed += 1
+    schemas.save()
+    
+    if len(configs) > 1:
+        print(f"\n{'✅' if not failed else '❌'} {len(configs) - failed}/{len(configs)} report config(s) valid")
+    sys.exit(1 if failed else 0)
 
 
 if __name__ == "__main__":
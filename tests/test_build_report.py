@@ -0,0 +1,50 @@
+import yaml
+
+from build_report import build_report
+
+DATA = "Datum,Totaal\n2021-01-01,10\n2021-02-01,12\n2021-03-01,11\n"
+
+
+def write_report(tmp_path):
+    data = tmp_path / "docs" / "assets" / "reports" / "r" / "data.csv"
+    data.parent.mkdir(parents=True)
+    data.write_text(DATA)
+    config = tmp_path / "config.yml"
+    config.write_text(yaml.safe_dump({
+        "report": {"slug": "r", "data": "assets/reports/r/data.csv", "output_dir": "assets/reports/r/charts"},
+        "charts": [{"id": "totaal", "type": "line_multi", "x": "Datum", "ys": ["Totaal"]}],
+    }))
+    return config
+
+
+def test_legacy_off_removes_earlier_copies(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = write_report(tmp_path)
+    legacy_dir = tmp_path / "docs" / "assets" / "r-totaal"
+    clean = tmp_path / "docs" / "assets" / "reports" / "r" / "charts" / "totaal" / "totaal.html"
+
+    build_report(str(config), legacy="link")
+    assert (legacy_dir / "totaal.html").read_bytes() == clean.read_bytes()
+    assert (legacy_dir / "asset.yml").exists()
+
+    build_report(str(config), legacy="off")
+    assert clean.exists()
+    assert not legacy_dir.exists()
+
+    # Cached charts are cleaned up as well
+    legacy_dir.mkdir()
+    (legacy_dir / "totaal.html").write_text("stale")
+    result = build_report(str(config), legacy="off")
+    assert result["hits"] == 1
+    assert not legacy_dir.exists()
+
+
+def test_legacy_off_keeps_unrelated_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = write_report(tmp_path)
+    legacy_dir = tmp_path / "docs" / "assets" / "r-totaal"
+
+    build_report(str(config), legacy="stub")
+    (legacy_dir / "notes.md").write_text("kept")
+    build_report(str(config), legacy="off")
+    assert sorted(p.name for p in legacy_dir.iterdir()) == ["notes.md"]
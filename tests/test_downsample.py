@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+
+from macros.downsample import downsample_figure, downsample_options, lttb_indices, minmax_indices
+
+
+def noisy(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.arange(n, dtype=float), np.cumsum(rng.normal(size=n))
+
+
+def test_options():
+    assert downsample_options(800) == ("lttb", 800)
+    assert downsample_options({"method": "minmax", "points": 500}) == ("minmax", 500)
+    assert downsample_options({}) == ("lttb", 1000)
+
+
+@pytest.mark.parametrize("spec", [{"method": "mean"}, 3, "800", {"points": 10.5}])
+def test_options_rejects(spec):
+    with pytest.raises(ValueError):
+        downsample_options(spec)
+
+
+@pytest.mark.parametrize("points", [4, 100, 999])
+def test_lttb_shape(points):
+    x, y = noisy()
+    idx = lttb_indices(x, y, points)
+    assert len(idx) == points
+    assert idx[0] == 0 and idx[-1] == len(y) - 1
+    assert np.all(np.diff(idx) > 0)
+
+
+def test_lttb_keeps_spike():
+    y = np.zeros(10_000)
+    y[4321] = 50.0
+    assert 4321 in lttb_indices(np.arange(len(y)), y, 100)
+
+
+def test_lttb_short_input_unchanged():
+    assert list(lttb_indices([1, 2, 3], [3.0, 1.0, 2.0], 10)) == [0, 1, 2]
+
+
+def test_lttb_dates_match_numeric_x():
+    _, y = noisy(2000)
+    dates = pd.date_range("2000-01-01", periods=len(y), freq="D")
+    expected = lttb_indices(np.arange(len(y)), y, 200)
+    assert np.array_equal(lttb_indices(dates.to_numpy(), y, 200), expected)
+    assert np.array_equal(lttb_indices(dates.strftime("%Y-%m-%d").to_numpy(), y, 200), expected)
+
+
+def test_lttb_ignores_nan():
+    x, y = noisy()
+    y[100:400] = np.nan
+    idx = lttb_indices(x, y, 300)
+    assert len(idx) == 300 and np.all(np.diff(idx) > 0)
+
+
+def test_minmax_keeps_extremes():
+    x, y = noisy()
+    idx = minmax_indices(y, 200)
+    assert len(idx) <= 200
+    assert idx[0] == 0 and idx[-1] == len(y) - 1
+    assert np.all(np.diff(idx) > 0)
+    assert np.argmin(y) in idx and np.argmax(y) in idx
+
+
+def test_figure_trims_aligned_arrays():
+    x, y = noisy()
+    fig = go.Figure([
+        go.Scatter(x=x, y=y, customdata=np.arange(len(y)), text="same label"),
+        go.Scatter(x=x[:50], y=y[:50]),
+        go.Bar(x=x, y=y),
+    ])
+    downsample_figure(fig, "lttb", 500)
+    line, short, bar = fig.data
+    assert len(line.x) == len(line.y) == len(line.customdata) == 500
+    assert np.array_equal(np.asarray(line.y), y[np.asarray(line.customdata)])
+    assert line.text == "same label"
+    assert len(short.y) == 50
+    assert len(bar.y) == len(y)
+
+
+def test_stackgroup_shares_indices():
+    x, a = noisy(seed=1)
+    _, b = noisy(seed=2)
+    fig = go.Figure([
+        go.Scatter(x=x, y=a, stackgroup="one", customdata=np.arange(len(x))),
+        go.Scatter(x=x, y=b, stackgroup="one", customdata=np.arange(len(x))),
+    ])
+    downsample_figure(fig, "minmax", 300)
+    first, second = fig.data
+    assert len(first.x) <= 300
+    assert np.array_equal(np.asarray(first.x), np.asarray(second.x))
+    assert np.array_equal(np.asarray(second.y), b[np.asarray(second.customdata)])
+
+
+def test_stackgroup_with_different_x_is_left_alone():
+    x, y = noisy()
+    fig = go.Figure([
+        go.Scatter(x=x, y=y, stackgroup="one"),
+        go.Scatter(x=x + 0.5, y=y, stackgroup="one"),
+    ])
+    downsample_figure(fig, "lttb", 500)
+    assert [len(t.y) for t in fig.data] == [len(y), len(y)]
@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from macros.jsonstream import iter_json_array
+
+ROWS = [
+    {"Maand": "Januari 2021", "Gewest": "Vlaams Gewest", "Starters": 12, "ratio": 1.25},
+    {"Maand": "Februari 2021", "Gewest": "Waals Gewest, \"Buitenland\" ]}", "Starters": -3, "ratio": 1e-5},
+    {"nested": {"list": [1, [2, {"a": "]"}]], "empty": {}}, "flag": True, "none": None},
+    [1234567890.125, "x"],
+    0.5,
+]
+
+
+def write(tmp_path, doc, name="data.json"):
+    path = tmp_path / name
+    path.write_text(doc if isinstance(doc, str) else json.dumps(doc), encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 16])
+def test_top_level_array_matches_json_load(tmp_path, chunk_size):
+    path = write(tmp_path, ROWS)
+    assert list(iter_json_array(path, chunk_size=chunk_size)) == ROWS
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 1 << 16])
+def test_array_under_key_skips_other_members(tmp_path, chunk_size):
+    doc = {"meta": {"facts": [0], "note": "[not this]"}, "count": 2.5, "facts": ROWS, "after": [9]}
+    path = write(tmp_path, json.dumps(doc, indent=2))
+    assert list(iter_json_array(path, key="facts", chunk_size=chunk_size)) == ROWS
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 4])
+def test_numbers_split_across_chunks(tmp_path, chunk_size):
+    path = write(tmp_path, "[1.5,22.25,-3e2,4]")
+    assert list(iter_json_array(path, chunk_size=chunk_size)) == [1.5, 22.25, -300.0, 4]
+
+
+@pytest.mark.parametrize("doc", ["[]", "  [ \n ]  ", '{"facts": []}'])
+def test_empty_array(tmp_path, doc):
+    assert list(iter_json_array(write(tmp_path, doc), key="facts")) == []
+
+
+def test_is_lazy(tmp_path):
+    path = write(tmp_path, "[1, 2, oops]")
+    rows = iter_json_array(path, chunk_size=2)
+    assert next(rows) == 1
+    assert next(rows) == 2
+    with pytest.raises(json.JSONDecodeError):
+        next(rows)
+
+
+def test_missing_key(tmp_path):
+    path = write(tmp_path, {"other": [1]})
+    with pytest.raises(ValueError, match="No 'facts' array"):
+        list(iter_json_array(path, key="facts"))
+
+
+def test_object_without_key(tmp_path):
+    path = write(tmp_path, {"facts": [1]})
+    with pytest.raises(ValueError, match="Expected '\\['"):
+        list(iter_json_array(path))
+
+
+def test_missing_comma(tmp_path):
+    path = write(tmp_path, "[1 2]")
+    with pytest.raises(ValueError, match="Expected ','"):
+        list(iter_json_array(path))
@@ -0,0 +1,144 @@
+import json
+
+import pandas as pd
+import pytest
+
+from macros import pipeline as P
+from macros.pipeline import parse_pipelines, plan
+
+FACTS = [
+    {"Sectie": "F", "Gewest": "Vlaams Gewest", "Maand": "Januari 2021", "Starters": 3, "Stoppers": 1, "Extra": "x"},
+    {"Sectie": "F", "Gewest": "Waals Gewest", "Maand": "Januari 2021", "Starters": 2, "Stoppers": 2, "Extra": "y"},
+    {"Sectie": "G", "Gewest": "Vlaams Gewest", "Maand": "Januari 2021", "Starters": 9, "Stoppers": 9, "Extra": "z"},
+    {"Sectie": "F", "Gewest": "Buitenland", "Maand": "Februari 2021", "Starters": 7, "Stoppers": 0, "Extra": "w"},
+    {"Sectie": "F", "Gewest": "Vlaams Gewest", "Maand": "Februari 2021", "Starters": 4, "Stoppers": 3, "Extra": "v"},
+]
+
+
+def one(steps, source=None, sink="out.csv", columns=None):
+    sink = {"path": sink, **({"columns": columns} if columns else {})}
+    item = {"name": "p", "source": source or {"json": "raw.json", "key": "facts"}, "steps": steps, "sink": sink}
+    return parse_pipelines([item])[0]
+
+
+def test_parse_orders_upstream_first():
+    items = [
+        {"name": "yoy", "source": {"pipeline": "monthly"}},
+        {"name": "monthly", "source": {"csv": "a.csv"}},
+    ]
+    assert [p.name for p in parse_pipelines(items)] == ["monthly", "yoy"]
+    assert parse_pipelines([{"source": {"csv": "a.csv"}, "sink": "b.csv"}])[0].sink == {"path": "b.csv"}
+
+
+@pytest.mark.parametrize("items, message", [
+    ([{"name": "a", "source": {"csv": "x", "json": "y"}}], "exactly one"),
+    ([{"name": "a", "source": {"csv": "x"}, "steps": [{"sort": {}}]}], "invalid step"),
+    ([{"name": "a", "source": {"csv": "x"}, "steps": [{"filter": {"column": "c"}}]}], "filter needs"),
+    ([{"name": "a", "source": {"csv": "x"}, "steps": [{"derive": {"op": "ratio"}}]}], "unknown derive op"),
+    ([{"name": "a", "source": {"pipeline": "b"}}, {"name": "b", "source": {"pipeline": "a"}}], "cycle"),
+    ([{"name": "a", "source": {"pipeline": "nope"}}], "Unknown pipeline"),
+    ([{"name": "a", "source": {"csv": "x"}}, {"name": "a", "source": {"csv": "y"}}], "Duplicate"),
+])
+def test_parse_rejects(items, message):
+    with pytest.raises(ValueError, match=message):
+        parse_pipelines(items)
+
+
+def test_plan_pushes_leading_filters_into_json_source():
+    steps = [{"filter": {"column": "Sectie", "equals": "F"}},
+             {"filter": {"column": "Gewest", "not_in": ["Buitenland"]}},
+             {"rename": {"Starters": "S"}},
+             {"filter": {"column": "S", "notna": True}}]
+    pushdown, live, need = plan(one(steps))
+    assert pushdown == [{"column": "Sectie", "equals": "F"}, {"column": "Gewest", "not_in": ["Buitenland"]}]
+    assert [stage for stage, _ in live] == ["rename", "filter"]
+    assert need is None
+
+    pushdown, live, _ = plan(one(steps, source={"csv": "raw.csv"}))
+    assert pushdown == []
+    assert [stage for stage, _ in live] == ["filter", "filter", "rename", "filter"]
+
+
+def test_plan_narrows_columns_and_drops_dead_stages():
+    steps = [{"rename": {"Starters": "S", "Stoppers": "T"}},
+             {"parse_dates": {"column": "Maand", "to": "Datum", "format": "nl_month"}},
+             {"cast": {"S": "Int64", "T": "Int64"}},
+             {"derive": {"column": "Unused", "from": "T", "op": "diff"}},
+             {"aggregate": {"by": "Datum", "sum": ["S", "T"], "mean": "S"}}]
+    _, live, need = plan(one(steps, columns=["Datum", "S"]))
+    assert [stage for stage, _ in live] == ["rename", "parse_dates", "cast", "aggregate"]
+    assert live[2][1] == {"S": "Int64"}
+    assert live[3][1] == {"by": ["Datum"], "aggs": [("S", "sum"), ("S", "mean")]}
+    assert need == {"Maand", "Starters"}
+
+
+def test_plan_keeps_filter_columns():
+    steps = [{"rename": {"Starters": "S"}}, {"filter": {"column": "Gewest", "equals": "Vlaams Gewest"}}]
+    assert plan(one(steps, source={"csv": "raw.csv"}, columns=["S"]))[2] == {"Starters", "Gewest"}
+
+
+@pytest.fixture
+def report(tmp_path, monkeypatch):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "raw.json").write_text(json.dumps({"meta": {}, "facts": FACTS}))
+    monkeypatch.setattr(P, "DOCS_DIR", docs)
+    monkeypatch.setattr(P, "CACHE_DIR", tmp_path / "cache")
+    return docs
+
+
+ITEMS = [
+    {"name": "monthly",
+     "source": {"json": "raw.json", "key": "facts"},
+     "steps": [{"filter": {"column": "Sectie", "startswith": "F"}},
+               {"filter": {"column": "Gewest", "not_in": ["Buitenland"]}},
+               {"parse_dates": {"column": "Maand", "to": "Datum", "format": "nl_month"}},
+               {"aggregate": {"by": "Datum", "sum": ["Starters", "Stoppers"]}}],
+     "sink": "monthly.csv"},
+    {"name": "net",
+     "source": {"pipeline": "monthly"},
+     "steps": [{"derive": {"column": "Cum", "from": "Starters", "op": "cumsum", "sort_by": "Datum"}}],
+     "sink": {"path": "net.csv", "columns": ["Datum", "Cum"]}},
+]
+
+
+def test_run_pipelines_builds_then_caches(report):
+    results = P.run_pipelines(ITEMS, "r")
+    assert [(r["name"], r["status"], r["rows"]) for r in results] == [("monthly", "built", 2), ("net", "built", 2)]
+    monthly = pd.read_csv(report / "monthly.csv")
+    assert monthly.to_dict("list") == {"Datum": ["2021-01-01", "2021-02-01"], "Starters": [5, 4], "Stoppers": [3, 3]}
+    assert pd.read_csv(report / "net.csv").to_dict("list") == {"Datum": ["2021-01-01", "2021-02-01"], "Cum": [5, 9]}
+
+    assert [r["status"] for r in P.run_pipelines(ITEMS, "r")] == ["cached", "cached"]
+    assert [r["status"] for r in P.run_pipelines(ITEMS, "r", force=True)] == ["built", "built"]
+
+
+def test_changed_stage_resumes_from_checkpoint(report, monkeypatch):
+    P.run_pipelines(ITEMS, "r")
+    reads = []
+    read_json = P._read_json
+    monkeypatch.setattr(P, "_read_json", lambda *args: reads.append(args) or read_json(*args))
+
+    items = json.loads(json.dumps(ITEMS))
+    items[0]["steps"][-1]["aggregate"] = {"by": "Datum", "sum": ["Stoppers", "Starters"]}
+    results = P.run_pipelines(items, "r")
+    assert [r["status"] for r in results] == ["built", "built"]
+    assert reads == []
+    assert list(pd.read_csv(report / "monthly.csv").columns) == ["Datum", "Stoppers", "Starters"]
+
+    # A new source file invalidates every checkpoint of the pipeline
+    (report / "raw.json").write_text(json.dumps({"facts": FACTS[:1]}))
+    assert P.run_pipelines(items, "r")[0]["rows"] == 1
+    assert len(reads) == 1
+
+
+def test_unused_checkpoints_are_pruned(report):
+    P.run_pipelines(ITEMS, "r")
+    store = P.CACHE_DIR / "r"
+    before = set(store.glob("*.pkl"))
+    assert before
+    items = json.loads(json.dumps(ITEMS))
+    items[0]["steps"][0]["filter"]["startswith"] = "G"
+    P.run_pipelines(items, "r")
+    after = set(store.glob("*.pkl"))
+    assert after and not before & after
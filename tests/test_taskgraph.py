@@ -0,0 +1,132 @@
+from pathlib import Path
+
+import pytest
+
+from macros.taskgraph import DONE, FAILED, PARTIAL, Task, TaskGraph, expand, run_action
+
+
+def upper(src: str, dst: str, status: str = DONE) -> str:
+    """Task action: dst = src upper-cased"""
+    print(f"{src} -> {dst}")
+    Path(dst).write_text(Path(src).read_text().upper())
+    return status
+
+
+def boom() -> str:
+    raise SystemExit(2)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Path("a.txt").write_text("a")
+    return tmp_path
+
+
+def graph(status=DONE):
+    return TaskGraph([
+        Task("first", upper, inputs=["a.txt"], outputs=["b.txt"], args={"src": "a.txt", "dst": "b.txt"}),
+        Task("second", upper, deps=["first"], inputs=["b.txt"], outputs=["c.txt"],
+             args={"src": "b.txt", "dst": "c.txt", "status": status}),
+    ], Path(".cache/build.json"))
+
+
+def statuses(outcomes):
+    return {name: outcome["status"] for name, outcome in outcomes.items()}
+
+
+def test_expand(workdir):
+    Path("d/e").mkdir(parents=True)
+    for name in ("d/x.csv", "d/e/y.csv", "d/e/y.csv.gz"):
+        Path(name).write_text("")
+    assert expand(["d/**"], exclude=(".gz",)) == ["d/e/y.csv", "d/x.csv"]
+    assert expand(lambda: ["d/x.csv", "missing.csv"]) == ["d/x.csv"]
+
+
+def test_closure_orders_dependencies_first(workdir):
+    assert graph().closure(["second"]) == ["first", "second"]
+    with pytest.raises(ValueError, match="Unknown task"):
+        graph().closure(["third"])
+    with pytest.raises(ValueError, match="unknown task"):
+        TaskGraph([Task("x", upper, deps=["y"])], Path("c.json"))
+    loop = TaskGraph([Task("x", upper, deps=["y"]), Task("y", upper, deps=["x"])], Path("c.json"))
+    with pytest.raises(ValueError, match="cycle: x -> y -> x"):
+        loop.closure(["x"])
+
+
+def test_run_then_up_to_date(workdir):
+    outcomes = graph().run(["second"])
+    assert statuses(outcomes) == {"first": DONE, "second": DONE}
+    assert Path("c.txt").read_text() == "A"
+    assert outcomes["first"]["log"] == "a.txt -> b.txt\n"
+    assert statuses(graph().run(["second"])) == {"first": "up to date", "second": "up to date"}
+    assert graph().plan(["second"]) == {"first": [], "second": []}
+
+
+def test_changes_propagate(workdir):
+    graph().run(["second"])
+    Path("a.txt").write_text("b")
+    assert graph().plan(["second"]) == {"first": ["a.txt"], "second": ["after first"]}
+    outcomes = graph().run(["second"])
+    assert outcomes["second"]["reasons"] == ["b.txt"]
+    assert Path("c.txt").read_text() == "B"
+
+    # Same output content: the dependent stays up to date
+    Path("a.txt").write_text("B")
+    assert statuses(graph().run(["second"])) == {"first": DONE, "second": "up to date"}
+
+
+def test_edited_output_reruns(workdir):
+    graph().run(["second"])
+    Path("c.txt").write_text("edited")
+    outcomes = graph().run(["second"])
+    assert outcomes["second"]["reasons"] == ["c.txt changed"]
+    assert Path("c.txt").read_text() == "A"
+
+
+def test_force(workdir):
+    graph().run(["second"])
+    assert graph().plan(["second"], force=True) == {"first": ["forced"], "second": ["forced"]}
+    assert statuses(graph().run(["first"], force=True)) == {"first": DONE}
+
+
+def test_failure_blocks_dependents_and_reruns(workdir):
+    Path("a.txt").unlink()
+    outcomes = graph().run(["second"])
+    assert statuses(outcomes) == {"first": FAILED, "second": "blocked"}
+    assert "FileNotFoundError" in outcomes["first"]["error"]
+    Path("a.txt").write_text("a")
+    assert statuses(graph().run(["second"])) == {"first": DONE, "second": DONE}
+
+
+def test_partial_is_kept_until_inputs_change(workdir):
+    assert statuses(graph(PARTIAL).run(["second"])) == {"first": DONE, "second": PARTIAL}
+    outcomes = graph(PARTIAL).run(["second"])
+    assert statuses(outcomes) == {"first": "up to date", "second": "up to date"}
+    assert outcomes["second"]["reasons"] == ["partial, inputs unchanged"]
+    Path("a.txt").write_text("b")
+    assert statuses(graph(PARTIAL).run(["second"])) == {"first": DONE, "second": PARTIAL}
+
+
+def test_action_args_are_part_of_the_record(workdir):
+    graph().run(["second"])
+    assert graph(PARTIAL).plan(["second"])["second"] == ["action"]
+
+
+def test_parallel_matches_serial(workdir):
+    Path("x.txt").write_text("x")
+    tasks = [
+        Task("first", upper, inputs=["a.txt"], outputs=["b.txt"], args={"src": "a.txt", "dst": "b.txt"}),
+        Task("other", upper, inputs=["x.txt"], outputs=["y.txt"], args={"src": "x.txt", "dst": "y.txt"}),
+        Task("both", upper, deps=["first", "other"], inputs=["b.txt"], args={"src": "b.txt", "dst": "c.txt"}),
+    ]
+    outcomes = TaskGraph(tasks, Path("build.json")).run(["both"], jobs=2)
+    assert list(outcomes)[-1] == "both"
+    assert set(statuses(outcomes).values()) == {DONE}
+    assert Path("y.txt").read_text() == "X" and Path("c.txt").read_text() == "A"
+
+
+def test_run_action_never_raises():
+    assert run_action(boom, {})["error"] == "SystemExit: 2"
+    result = run_action(lambda: "ok", {})
+    assert result["status"] == FAILED and result["error"] == "action returned 'ok'"
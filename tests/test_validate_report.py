@@ -0,0 +1,31 @@
+import pytest
+import yaml
+
+from validate_report import DataSchemas, check_columns, validate_report_config
+
+SCHEMA = {"columns": ["Datum", "YoY_pct", "Totaal"], "dtypes": {"Datum": "object", "YoY_pct": "float64", "Totaal": "int64"}}
+
+
+@pytest.mark.parametrize("ys", ["YoY_pct", ["YoY_pct", "Totaal"]])
+def test_ys_as_string_or_list(ys):
+    assert check_columns("c", {"type": "line_multi", "x": "Datum", "ys": ys}, SCHEMA) == ([], [])
+
+
+def test_missing_and_non_numeric_columns():
+    chart = {"x": "Date", "series": [{"column": "Totaal"}, {"column": "Datum"}], "ys": "Missing", "y": "YoY_pct"}
+    errors, warnings = check_columns("c", chart, SCHEMA)
+    assert errors == ["Chart 'c': X column 'Date' not found in data",
+                      "Chart 'c': Series column 'Missing' not found in data"]
+    assert warnings == ["Chart 'c': Series column 'Datum' is not numeric (sampled dtype: object)"]
+
+
+def test_config_with_string_ys(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "data.csv").write_text("Datum,YoY_pct\n2021-01-01,1.5\n")
+    config = tmp_path / "config.yml"
+    config.write_text(yaml.safe_dump({
+        "report": {"slug": "r", "title": "R", "data": "data.csv", "output_dir": "assets/r"},
+        "charts": [{"id": "yoy", "type": "line_multi", "x": "Datum", "ys": "YoY_pct"}],
+    }))
+    assert validate_report_config(str(config), DataSchemas())